@@ -0,0 +1,105 @@
+"""
+Compare the chunked array block reader used by `f_to_array` against the
+original line by line `np.genfromtxt` implementation.
+
+usage (from the repository root):
+    python -m benchmarks.bench_f_to_array [--sizes 1e6 1e7] [--skip-legacy]
+"""
+import argparse
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+from flopy.utils.flopy_io import line_strip
+
+from flopy4.data.constants import CommonNames
+from flopy4.data.mfarray import f_to_array
+
+
+def legacy_f_to_array(f):
+    astr = []
+    while True:
+        pos = f.tell()
+        line = f.readline()
+        line = line_strip(line)
+        if line in (
+                CommonNames.empty,
+                CommonNames.internal,
+                CommonNames.external,
+                CommonNames.constant
+        ):
+            f.seek(pos, 0)
+            break
+        elif CommonNames.internal in line or CommonNames.external in line \
+                or CommonNames.constant in line:
+            f.seek(pos, 0)
+            break
+        astr.append(line)
+
+    astr = StringIO(" ".join(astr))
+    array = np.genfromtxt(astr).ravel()
+    return array
+
+
+def write_block(fpath, size, ncol=10, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0., 100., size)
+    nrow, rem = divmod(size, ncol)
+    with open(fpath, "w") as f:
+        f.write("INTERNAL\n")
+        np.savetxt(f, values[:nrow * ncol].reshape(nrow, ncol), fmt="%.6e")
+        if rem:
+            np.savetxt(f, values[nrow * ncol:].reshape(1, rem), fmt="%.6e")
+        f.write("CONSTANT 1.0\n")
+    return values
+
+
+def time_reader(reader, fpath, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        with open(fpath) as f:
+            f.readline()
+            t0 = time.perf_counter()
+            array = reader(f)
+            best = min(best, time.perf_counter() - t0)
+            # the reader must leave the handle at the next control record
+            assert f.readline().startswith(CommonNames.constant)
+    return best, array
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1e6, 1e7])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            size = int(size)
+            fpath = Path(tmpdir) / f"block_{size}.txt"
+            expected = write_block(fpath, size)
+            mbytes = fpath.stat().st_size / 1e6
+
+            t_new, array = time_reader(f_to_array, fpath, args.repeat)
+            np.testing.assert_allclose(array, expected, rtol=1e-6)
+            print(
+                f"{size:>10d} values ({mbytes:8.1f} MB)  f_to_array: "
+                f"{t_new:8.3f} s ({mbytes / t_new:7.1f} MB/s)"
+            )
+            if args.skip_legacy:
+                continue
+
+            t_old, array = time_reader(legacy_f_to_array, fpath, 1)
+            np.testing.assert_allclose(array, expected, rtol=1e-6)
+            print(
+                f"{size:>10d} values ({mbytes:8.1f} MB)  genfromtxt: "
+                f"{t_old:8.3f} s ({mbytes / t_old:7.1f} MB/s)  "
+                f"speedup: {t_old / t_new:6.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Import time benchmark for the flopy4.data modules.
+
+Each module is imported in a fresh interpreter under `python -X importtime`
+and the cumulative import time of the top-level imports is recorded (best
+of --repeat runs). Heavy optional dependencies that were loaded by the
+import are listed, since flopy4.data should only load them on the code
+paths that need them. Results can be saved as JSON and compared against
+a previous run to track regressions.
+
+usage (from the repository root):
+    python -m benchmarks.bench_import [--modules flopy4.data]
+        [--repeat 5] [--json out.json] [--compare old.json]
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+MODULES = [
+    "flopy4.data",
+    "flopy4.data.mfarray",
+    "flopy4.data.mflist",
+    "flopy4.data.binary",
+    "flopy4.data.scanner",
+]
+
+# dependencies that are only needed by some code paths
+HEAVY = ["flopy", "pandas", "xarray", "dask", "matplotlib"]
+
+
+def import_time(module):
+    """
+    Import a module in a fresh interpreter
+
+    Returns
+    -------
+        tuple : (import time in seconds, list of heavy modules loaded)
+    """
+    code = (
+        f"import sys, {module}; "
+        f"print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        # nested imports are indented, only count top-level imports
+        if cumulative.strip().isdigit() and not name[1:].startswith(" "):
+            total += int(cumulative)
+    return total / 1e6, proc.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    args = parser.parse_args()
+
+    previous = {}
+    if args.compare is not None:
+        previous = json.loads(args.compare.read_text())
+
+    results = {}
+    print(f"{'module':<24}{'time (s)':>12}  heavy modules")
+    for module in args.modules:
+        best = min(import_time(module)[0] for _ in range(args.repeat))
+        _, heavy = import_time(module)
+        results[module] = {"time": best, "heavy": heavy}
+        line = f"{module:<24}{best:>12.5f}  {' '.join(heavy) or '-'}"
+        if module in previous:
+            line += f"  ({best / previous[module]['time']:5.2f}x time)"
+        print(line)
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
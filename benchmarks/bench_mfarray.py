@@ -0,0 +1,307 @@
+"""
+Benchmark suite for the MFArray load, access, arithmetic and write paths
+and the BinaryArray/BinaryList readers.
+
+Each case is timed (best of --repeat runs) and run once more under
+tracemalloc to record the peak memory allocated by Python and NumPy.
+Memory mapped pages are not counted. Results can be saved as JSON and
+compared against a previous run to track regressions between releases.
+
+usage (from the repository root):
+    python -m benchmarks.bench_mfarray [--sizes 1e3 1e5 1e6 1e7]
+        [--cases load access] [--json out.json] [--compare old.json]
+"""
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from flopy4.data.binary import BinaryArray
+from flopy4.data.mfarray import MFArray
+from benchmarks import generators as gen
+
+CASES = {}
+
+
+def case(group):
+    """
+    Register a benchmark case. The decorated function is called as
+    func(tmpdir, size) and returns the callable that is timed.
+    """
+    def decorator(func):
+        CASES[func.__name__] = (group, func)
+        return func
+    return decorator
+
+
+def _load(fpath, shape, layered=False):
+    def run():
+        with open(fpath) as f:
+            return MFArray.load(f, fpath.parent, shape, layered=layered)
+    return run
+
+
+def _loaded(tmpdir, size, name="internal"):
+    shape = gen.layer_shape(size)
+    fpath = tmpdir / f"{name}.txt"
+    gen.write_internal(fpath, gen.random_values(size))
+    return _load(fpath, shape)()
+
+
+def _loaded_layered(tmpdir, size):
+    shape = (3,) + gen.layer_shape(max(size // 3, 1))
+    fpath = tmpdir / "layered.txt"
+    gen.write_mixed_layered(fpath, gen.random_values(int(np.prod(shape)))
+                            .reshape(shape))
+    return _load(fpath, shape, layered=True)()
+
+
+# load
+@case("load")
+def load_constant(tmpdir, size):
+    fpath = tmpdir / "constant.txt"
+    gen.write_constant(fpath)
+    return _load(fpath, gen.layer_shape(size))
+
+
+@case("load")
+def load_internal(tmpdir, size):
+    fpath = tmpdir / "internal.txt"
+    gen.write_internal(fpath, gen.random_values(size))
+    return _load(fpath, gen.layer_shape(size))
+
+
+@case("load")
+def load_external(tmpdir, size):
+    fpath = tmpdir / "external.txt"
+    gen.write_external(fpath, "array_ext.txt", gen.random_values(size))
+    return _load(fpath, gen.layer_shape(size))
+
+
+@case("load")
+def load_binary(tmpdir, size):
+    shape = gen.layer_shape(size)
+    fpath = tmpdir / "external_binary.txt"
+    gen.write_binary(
+        fpath, "array_bin.bin", gen.random_values(size).reshape(shape)
+    )
+    return _load(fpath, shape)
+
+
+@case("load")
+def load_internal_layered(tmpdir, size):
+    shape = (3,) + gen.layer_shape(max(size // 3, 1))
+    fpath = tmpdir / "internal_layered.txt"
+    values = gen.random_values(int(np.prod(shape))).reshape(shape)
+    gen.write_internal_layered(fpath, values)
+    return _load(fpath, shape, layered=True)
+
+
+@case("load")
+def load_mixed_layered(tmpdir, size):
+    shape = (3,) + gen.layer_shape(max(size // 3, 1))
+    fpath = tmpdir / "mixed_layered.txt"
+    values = gen.random_values(int(np.prod(shape))).reshape(shape)
+    gen.write_mixed_layered(fpath, values)
+    return _load(fpath, shape, layered=True)
+
+
+# access
+@case("access")
+def values_internal(tmpdir, size):
+    mfa = _loaded(tmpdir, size)
+    return lambda: mfa.values
+
+
+@case("access")
+def raw_values_layered(tmpdir, size):
+    mfa = _loaded_layered(tmpdir, size)
+    return lambda: mfa.raw_values
+
+
+@case("access")
+def getitem_layered(tmpdir, size):
+    mfa = _loaded_layered(tmpdir, size)
+
+    def run():
+        for k in range(3):
+            mfa[k, 0, 0]
+    return run
+
+
+@case("access")
+def setitem_internal(tmpdir, size):
+    mfa = _loaded(tmpdir, size)
+
+    def run():
+        mfa[0, 0] = 1.
+    return run
+
+
+@case("access")
+def setitem_layered(tmpdir, size):
+    mfa = _loaded_layered(tmpdir, size)
+
+    def run():
+        mfa[2, 0, 0] = 1.
+    return run
+
+
+# arithmetic and reductions
+@case("arithmetic")
+def iadd_internal(tmpdir, size):
+    mfa = _loaded(tmpdir, size)
+
+    def run():
+        nonlocal mfa
+        mfa += 1.
+    return run
+
+
+@case("arithmetic")
+def imul_layered(tmpdir, size):
+    mfa = _loaded_layered(tmpdir, size)
+
+    def run():
+        nonlocal mfa
+        mfa *= 1.
+    return run
+
+
+@case("arithmetic")
+def ufunc_layered(tmpdir, size):
+    mfa = _loaded_layered(tmpdir, size)
+    return lambda: np.sqrt(mfa)
+
+
+@case("arithmetic")
+def reductions_internal(tmpdir, size):
+    mfa = _loaded(tmpdir, size)
+
+    def run():
+        for reduction in ("min", "mean", "median", "max", "std", "sum"):
+            getattr(mfa, reduction)()
+    return run
+
+
+@case("arithmetic")
+def reductions_layered(tmpdir, size):
+    mfa = _loaded_layered(tmpdir, size)
+
+    def run():
+        for reduction in ("min", "mean", "median", "max", "std", "sum"):
+            getattr(mfa, reduction)()
+    return run
+
+
+# write
+@case("write")
+def write_internal(tmpdir, size):
+    mfa = _loaded(tmpdir, size)
+
+    def run():
+        with open(tmpdir / "out.txt", "w") as f:
+            mfa.write(f)
+    return run
+
+
+@case("write")
+def write_layered(tmpdir, size):
+    mfa = _loaded_layered(tmpdir, size)
+    out = tmpdir / "out"
+    out.mkdir(exist_ok=True)
+
+    def run():
+        with open(out / "layered.txt", "w") as f:
+            mfa.write(f, out)
+    return run
+
+
+# binary readers
+@case("binary")
+def binary_array_memmap(tmpdir, size):
+    shape = (3,) + gen.layer_shape(max(size // 3, 1))
+    fpath = tmpdir / "binary.txt"
+    values = gen.random_values(int(np.prod(shape))).reshape(shape)
+    gen.write_binary(fpath, "array_bin.bin", values)
+
+    def run():
+        data, _ = BinaryArray().memmap_binary_data_from_file(
+            tmpdir / "array_bin.bin", shape
+        )
+        return data.sum()
+    return run
+
+
+@case("binary")
+def binary_list_read(tmpdir, size):
+    fpath = tmpdir / "list.bin"
+    blist, modelgrid = gen.write_binary_list(fpath, size, (3, 100, 100))
+    return lambda: blist.read_binary_data_from_file(fpath, modelgrid)
+
+
+def measure(run, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - t0)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "--sizes", nargs="+", type=float, default=[1e3, 1e5, 1e6]
+    )
+    parser.add_argument(
+        "--cases", nargs="+", default=None,
+        help="case names or groups to run (default: all)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    args = parser.parse_args()
+
+    previous = {}
+    if args.compare is not None:
+        previous = json.loads(args.compare.read_text())
+
+    results = {}
+    print(f"{'case':<24}{'size':>10}{'time (s)':>12}{'peak (MB)':>12}")
+    for name, (group, setup) in CASES.items():
+        if args.cases and name not in args.cases and \
+                group not in args.cases:
+            continue
+        for size in args.sizes:
+            size = int(size)
+            with tempfile.TemporaryDirectory() as tmpdir:
+                run = setup(Path(tmpdir), size)
+                best, peak = measure(run, args.repeat)
+            key = f"{name}[{size}]"
+            results[key] = {"time": best, "peak": peak}
+            line = f"{name:<24}{size:>10d}{best:>12.5f}{peak / 1e6:>12.2f}"
+            if key in previous:
+                line += f"  ({best / previous[key]['time']:5.2f}x time, " \
+                        f"{peak / max(previous[key]['peak'], 1):5.2f}x peak)"
+            print(line)
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Synthetic MODFLOW 6 array and list inputs for the benchmarks. The files
+mirror the layouts of the data/mfarray fixtures at arbitrary sizes.
+"""
+import numpy as np
+from flopy.utils.binaryfile import BinaryHeader
+
+from flopy4.data.binary import BinaryList
+from flopy4.data.writers import write_array_block
+
+
+def layer_shape(size, ncol=100):
+    """
+    Two-dimensional (nrow, ncol) shape with `size` cells
+    """
+    ncol = min(ncol, size)
+    return size // ncol, ncol
+
+
+def random_values(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0., 100., size)
+
+
+def write_constant(fpath, value=10.):
+    with open(fpath, "w") as f:
+        f.write(f"CONSTANT {value}\n")
+
+
+def write_internal(fpath, values, factor=None):
+    with open(fpath, "w") as f:
+        _write_internal(f, values, factor)
+
+
+def _write_internal(f, values, factor=None):
+    control = "INTERNAL"
+    if factor is not None:
+        control = f"{control} FACTOR {factor}"
+    f.write(f"{control}\n")
+    write_array_block(f, values, fmt="%.6e")
+
+
+def write_external(fpath, ext_name, values, factor=None):
+    """
+    Write an OPEN/CLOSE control record and its external text file, which
+    is placed next to the control record file
+    """
+    with open(fpath.parent / ext_name, "w") as f:
+        write_array_block(f, values, fmt="%.6e")
+    with open(fpath, "w") as f:
+        f.write(_external_record(ext_name, factor=factor))
+
+
+def write_binary(fpath, bin_name, values, factor=None):
+    """
+    Write an OPEN/CLOSE (BINARY) control record and its binary file with
+    one record per layer
+    """
+    layers = values if values.ndim == 3 else values[np.newaxis]
+    with open(fpath.parent / bin_name, "wb") as f:
+        for ilay, layer in enumerate(layers):
+            nrow, ncol = layer.shape
+            BinaryHeader.create(
+                bintype="vardis",
+                precision="double",
+                text="ARRAY",
+                m1=ncol,
+                m2=nrow,
+                m3=ilay + 1,
+                pertim=1.,
+                totim=1.,
+                kstp=1,
+                kper=1,
+            ).tofile(f)
+            np.ascontiguousarray(layer, dtype=np.float64).tofile(f)
+    with open(fpath, "w") as f:
+        f.write(_external_record(bin_name, binary=True, factor=factor))
+
+
+def _external_record(ext_name, binary=False, factor=None):
+    record = f"OPEN/CLOSE {ext_name}"
+    if binary:
+        record = f"{record} (BINARY)"
+    if factor is not None:
+        record = f"{record} FACTOR {factor}"
+    return f"{record}\n"
+
+
+def write_internal_layered(fpath, values):
+    with open(fpath, "w") as f:
+        for layer in values:
+            _write_internal(f, layer)
+
+
+def write_mixed_layered(fpath, values, ext_name="mixed_ext.txt"):
+    """
+    Write a three layer array with a CONSTANT, an OPEN/CLOSE, and an
+    INTERNAL layer, like data/mfarray/mixed_layered.txt
+    """
+    with open(fpath.parent / ext_name, "w") as f:
+        write_array_block(f, values[1], fmt="%.6e")
+    with open(fpath, "w") as f:
+        f.write("CONSTANT 10\n")
+        f.write(_external_record(ext_name, factor=1.0))
+        _write_internal(f, values[2], factor=1.0)
+
+
+def write_binary_list(fpath, nrec, shape, seed=0):
+    """
+    Write a structured grid binary list file with a single q field
+
+    Returns
+    -------
+        BinaryList, modelgrid stand-in
+    """
+    rng = np.random.default_rng(seed)
+    modelgrid = _Grid("structured")
+    blist = BinaryList(fields=[("q", np.float64)])
+    data = np.empty(nrec, dtype=blist._get_header(modelgrid, "double"))
+    for name, n in zip(("layer", "row", "col"), shape):
+        data[name] = rng.integers(1, n + 1, nrec)
+    data["q"] = rng.normal(size=nrec)
+    data.tofile(fpath)
+    return blist, modelgrid
+
+
+class _Grid:
+    def __init__(self, grid_type):
+        self.grid_type = grid_type
@@ -1,2 +1,8 @@
+from .cache import ParseCache
+from .ensemble import MFArrayEnsemble
 from .mfarray import MFArray
-from .mflist import MFList
\ No newline at end of file
+from .mflist import MFList
+from .output import BudgetFile, HeadFile
+from .profiling import Profiler
+from .scanner import FileIndex
+from .shared import SharedArrayHandle
\ No newline at end of file
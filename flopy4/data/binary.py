@@ -1,5 +1,9 @@
-from flopy.utils.binaryfile import BinaryHeader
+import os
 import numpy as np
+from pathlib import Path
+from . import profiling
+from .constants import CommonNames
+from .mixins import CHUNKSIZE
 
 
 # todo: clean this up to not need model information beyond grid_type,
@@ -9,12 +13,301 @@ import numpy as np
 #  module
 class BinaryException(Exception):
     def __init__(self, *args):
-        super.__init__(*args)
+        super().__init__(*args)
+
+
+class BinaryRecords:
+    """
+    Index of the records of a MODFLOW 6 binary array file
+
+    The headers of all records are read in a single pass, vectorized when
+    all records have the same size. Any subset of records, like a set of
+    layers or stress periods, can then be read in bulk by index without
+    scanning the file again.
+
+    Parameters
+    ----------
+    fname : str or PathLike
+        binary file name
+    data_type : np.dtype, optional
+        data type of the record values. By default the floating point type
+        of the header precision
+    precision : str, optional
+        header precision, "single" or "double". By default the precision
+        is detected from the first header
+    bintype : str
+        header type, "vardis", "vardisv", or "vardisu"
+    """
+    def __init__(
+        self, fname, data_type=None, precision=None, bintype="vardis"
+    ):
+        self._fname = Path(fname)
+        try:
+            self._size = os.path.getsize(fname)
+        except OSError as e:
+            raise BinaryException(f"Unable to open file {fname}.") from e
+        if precision is None:
+            precision = _detect_precision(fname, self._size, data_type)
+        if data_type is None:
+            data_type = np.float64 if precision == "double" else np.float32
+        self._precision = precision
+        self._data_type = np.dtype(data_type)
+        self._header_dtype = _header_dtype(
+            bintype=bintype, precision=precision
+        )
+        self._regular = False
+        with profiling.span("BinaryRecords.scan"):
+            profiling.annotate(fname)
+            self._headers, self._offsets = self._scan()
+            profiling.count(bytes_read=self._headers.nbytes)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    @property
+    def fname(self):
+        return self._fname
+
+    @property
+    def precision(self):
+        return self._precision
+
+    @property
+    def data_type(self):
+        return self._data_type
+
+    @property
+    def headers(self):
+        """
+        Returns
+        -------
+            np.ndarray : structured array with the header of every record
+        """
+        return self._headers
+
+    @property
+    def offsets(self):
+        """
+        Returns
+        -------
+            np.ndarray : byte offset of the values of every record
+        """
+        return self._offsets
+
+    @property
+    def counts(self):
+        """
+        Returns
+        -------
+            np.ndarray : number of values of every record
+        """
+        return self._headers["m1"].astype(np.int64) * self._headers["m2"]
+
+    def record_shape(self, index):
+        """
+        Shape of the values of a record, (m2, m1) for records with more
+        than one row and (m1,) otherwise
+
+        Parameters
+        ----------
+        index : int
+            record number
+
+        Returns
+        -------
+            tuple
+        """
+        header = self._headers[index]
+        m1, m2 = int(header["m1"]), int(header["m2"])
+        if m2 > 1:
+            return m2, m1
+        return (m1,)
+
+    def select(self, kstp=None, kper=None, text=None, ilay=None):
+        """
+        Record numbers that match header values
+
+        Parameters
+        ----------
+        kstp : int, optional
+            time step number
+        kper : int, optional
+            stress period number
+        text : str, optional
+            header text, compared without case and surrounding whitespace
+        ilay : int, optional
+            layer number, the m3 header value
+
+        Returns
+        -------
+            np.ndarray
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if kstp is not None:
+            mask &= self._headers["kstp"] == kstp
+        if kper is not None:
+            mask &= self._headers["kper"] == kper
+        if ilay is not None:
+            mask &= self._headers["m3"] == ilay
+        if text is not None:
+            texts = np.char.upper(np.char.strip(self._headers["text"]))
+            mask &= texts == text.strip().upper().encode()
+        return np.flatnonzero(mask)
+
+    @profiling.profiled("BinaryRecords.read")
+    def read(self, indices=None):
+        """
+        Read the values of records into memory
+
+        Parameters
+        ----------
+        indices : int, slice, or sequence of int, optional
+            record numbers. By default all records are read
+
+        Returns
+        -------
+            tuple : (np.ndarray, np.ndarray) the values with the record
+            number as the first dimension, and the record headers
+        """
+        indices = self._indices(indices)
+        headers = self._headers[indices]
+        if indices.size == 0:
+            return np.empty(0, dtype=self._data_type), headers
+        counts = self.counts[indices]
+        if np.any(counts != counts[0]):
+            raise BinaryException(
+                f"Records of binary file {self._fname} have different "
+                f"sizes and cannot be read into a single array."
+            )
+
+        shape = self.record_shape(indices[0])
+        if self._regular:
+            # one fancy indexing copy from the memory mapped records
+            data = self.memmap(mode="r")[indices]
+        else:
+            raw = np.memmap(self._fname, dtype=np.uint8, mode="r")
+            data = np.empty((indices.size, counts[0]), dtype=self._data_type)
+            for ix, index in enumerate(indices):
+                data[ix] = np.ndarray(
+                    counts[0],
+                    dtype=self._data_type,
+                    buffer=raw,
+                    offset=self._offsets[index],
+                )
+            del raw
+        profiling.count(bytes_read=data.nbytes, values=data.size)
+        profiling.allocated(data)
+        return data.reshape((indices.size,) + shape), headers
+
+    def memmap(self, mode="c"):
+        """
+        Memory map the values of all records of a file with records of
+        equal size, without reading them
+
+        Parameters
+        ----------
+        mode : str
+            np.memmap mode. The default "c" (copy-on-write) allows the
+            values to be modified in memory without changing the file
+
+        Returns
+        -------
+            np.ndarray : (nrecords, values per record) view of the file
+        """
+        if not self._regular:
+            raise BinaryException(
+                f"Records of binary file {self._fname} have different "
+                f"sizes and cannot be memory mapped as a single array."
+            )
+        raw = np.memmap(self._fname, dtype=np.uint8, mode=mode)
+        count = int(self.counts[0])
+        stride = self._offsets[1] - self._offsets[0] if len(self) > 1 \
+            else self._header_dtype.itemsize + count * self._data_type.itemsize
+        return np.ndarray(
+            (len(self), count),
+            dtype=self._data_type,
+            buffer=raw,
+            offset=int(self._offsets[0]),
+            strides=(int(stride), self._data_type.itemsize),
+        )
+
+    def _indices(self, indices):
+        if indices is None:
+            return np.arange(len(self))
+        if isinstance(indices, slice):
+            return np.arange(len(self))[indices]
+        indices = np.atleast_1d(np.asarray(indices, dtype=np.int64))
+        if indices.size and (indices.min() < -len(self) or
+                             indices.max() >= len(self)):
+            raise IndexError(
+                f"record index out of range for {len(self)} records"
+            )
+        return indices % max(len(self), 1)
+
+    def _scan(self):
+        """
+        Read the headers and compute the data offsets of all records
+        """
+        header_dtype = self._header_dtype
+        hsize = header_dtype.itemsize
+        itemsize = self._data_type.itemsize
+        if self._size < hsize:
+            return np.empty(0, dtype=header_dtype), np.empty(0, np.int64)
+
+        first = np.fromfile(self._fname, dtype=header_dtype, count=1)
+        count = int(first["m1"][0]) * int(first["m2"][0])
+        recsize = hsize + count * itemsize
+        if count > 0 and self._size % recsize == 0:
+            # all records the same size: read every header at once
+            nrec = self._size // recsize
+            raw = np.memmap(self._fname, dtype=np.uint8, mode="r")
+            headers = np.ndarray(
+                (nrec,), dtype=header_dtype, buffer=raw, strides=(recsize,)
+            ).copy()
+            del raw
+            counts = headers["m1"].astype(np.int64) * headers["m2"]
+            if np.all(counts == count):
+                self._regular = True
+                offsets = np.arange(nrec, dtype=np.int64) * recsize + hsize
+                return headers, offsets
+
+        headers = []
+        offsets = []
+        offset = 0
+        with open(self._fname, "rb") as fd:
+            while offset + hsize <= self._size:
+                fd.seek(offset)
+                header = np.fromfile(fd, dtype=header_dtype, count=1)
+                count = int(header["m1"][0]) * int(header["m2"][0])
+                offset += hsize
+                if count < 0 or offset + count * itemsize > self._size:
+                    raise BinaryException(
+                        f"Binary file {self._fname} is truncated or has an "
+                        f"invalid record header at byte {offset - hsize}."
+                    )
+                headers.append(header)
+                offsets.append(offset)
+                offset += count * itemsize
+        if offset != self._size:
+            raise BinaryException(
+                f"Binary file {self._fname} has {self._size - offset} "
+                f"trailing bytes after the last record."
+            )
+        headers = np.concatenate(headers)
+        offsets = np.array(offsets, dtype=np.int64)
+        counts = headers["m1"].astype(np.int64) * headers["m2"]
+        self._regular = bool(
+            np.all(counts == counts[0])
+            and np.unique(np.diff(offsets)).size <= 1
+        )
+        return headers, offsets
+
 
 class BinaryArray():
     def __init__(self):
         self._pos = 0
 
+    @profiling.profiled("BinaryArray.read_binary_data_from_file")
     def read_binary_data_from_file(
         self,
         fname,
@@ -24,50 +317,170 @@ class BinaryArray():
         modelgrid,
         read_multi_layer=False,
     ):
-        import flopy.utils.binaryfile as bf
-
         if not isinstance(modelgrid.ncpl, np.ndarray):
             if data_size != modelgrid.ncpl:
                 read_multi_layer = True
 
-        fd = _open_ext_file(fname, True)
         numpy_type, name = self.datum_to_numpy_type(data_type)
-        header_dtype = bf.BinaryHeader.set_dtype(
-            bintype=self._get_bintype(modelgrid), precision="double"
+        records = BinaryRecords(
+            fname,
+            data_type=numpy_type,
+            precision="double",
+            bintype=self._get_bintype(modelgrid),
         )
+        counts = records.counts
         if read_multi_layer and len(data_shape) > 1:
-            try:
-                all_data = np.empty(data_shape, numpy_type)
-                headers = []
-                layer_shape = data_shape[1:]
-                layer_data_size = int(data_size / data_shape[0])
-                for index in range(0, data_shape[0]):
-                    layer_data = self._read_binary_file_layer(
-                        fd,
-                        fname,
-                        header_dtype,
-                        numpy_type,
-                        layer_data_size,
-                        layer_shape,
-                    )
-                    all_data[index, :] = layer_data[0]
-                    headers.append(layer_data[1])
-                fd.close()
-                return all_data, headers
-            except BinaryException:
-                fd.seek(self._pos, 0)
-                bin_data = self._read_binary_file_layer(
-                    fd, fname, header_dtype, numpy_type, data_size, data_shape
-                )
-                self._pos = fd.tell()
-                fd.close()
-                return bin_data
-        else:
-            bin_data = self._read_binary_file_layer(
-                fd, fname, header_dtype, numpy_type, data_size, data_shape
+            nlay = data_shape[0]
+            if len(records) >= nlay and \
+                    np.all(counts[:nlay] * nlay == data_size):
+                data, headers = records.read(slice(0, nlay))
+                return data.reshape(data_shape), list(headers)
+        if len(records) == 0 or counts[0] != data_size:
+            found = counts[0] if len(records) else 0
+            raise BinaryException(
+                f"Binary file {fname} does not contain expected data. "
+                f"Expected array size {data_size} but found size {found}."
             )
-            fd.close()
-            return bin_data
+        data, headers = records.read(0)
+        return data.reshape(data_shape), headers
+
+    def datum_to_numpy_type(self, data_type):
+        """
+        Numpy type and type name of a data type
+
+        Parameters
+        ----------
+        data_type : str, np.dtype, or DatumType
+            data type, like "integer" or "double_precision"
+
+        Returns
+        -------
+            tuple : (numpy type, type name)
+        """
+        name = getattr(data_type, "name", data_type)
+        if name in ("integer", "int"):
+            return np.int32, "int"
+        if name in ("double_precision", "double"):
+            return np.float64, "double"
+        if name in ("single", "float"):
+            return np.float32, "float"
+        dtype = np.dtype(data_type)
+        return dtype.type, dtype.name
+
+    def _get_bintype(self, modelgrid):
+        return _bintype(modelgrid.grid_type)
+
+    @profiling.profiled("BinaryArray.memmap_binary_data_from_file")
+    def memmap_binary_data_from_file(
+        self,
+        fname,
+        data_shape,
+        data_type=np.float64,
+        precision="double",
+        mode="c",
+    ):
+        """
+        Memory map the records of a MODFLOW 6 binary array file
+
+        The record headers are indexed with BinaryRecords to compute the
+        byte offset of each record. No array data is read; the returned
+        array is a view into a memory map of the file and data is paged in
+        by the operating system when it is accessed.
+
+        Parameters
+        ----------
+        fname : str or PathLike
+            binary file name
+        data_shape : tuple
+            shape of the array. If the file contains one record per layer,
+            the first dimension is the number of layers
+        data_type : np.dtype
+            data type of the array values
+        precision : str
+            precision of the record header, "single" or "double"
+        mode : str
+            np.memmap mode. The default "c" (copy-on-write) allows the
+            array to be modified in memory without changing the file
+
+        Returns
+        -------
+            tuple : (np.ndarray, list of record headers). Each layer of the
+            array, data[k], is a zero-copy view into the memory map
+        """
+        profiling.annotate(fname)
+        records = BinaryRecords(
+            fname, data_type=data_type, precision=precision
+        )
+        numpy_type = records.data_type
+        data_size = int(np.prod(data_shape))
+
+        # records from the start of the file that make up the array
+        nvalues = np.cumsum(records.counts)
+        nrec = int(np.searchsorted(nvalues, data_size)) + 1
+        found = int(nvalues[min(nrec, len(records)) - 1]) if len(records) \
+            else 0
+        if found != data_size:
+            raise BinaryException(
+                f"Binary file {fname} does not contain expected data. "
+                f"Expected array size {data_size} but found size {found}."
+            )
+        offsets = records.offsets[:nrec]
+        headers = [records.headers[i:i + 1] for i in range(nrec)]
+
+        raw = np.memmap(fname, dtype=np.uint8, mode=mode)
+        if nrec == 1:
+            data = np.ndarray(
+                data_shape, dtype=numpy_type, buffer=raw,
+                offset=int(offsets[0]),
+            )
+            return data, headers
+
+        # one record per layer: stride over the record headers
+        if nrec != data_shape[0] or np.unique(np.diff(offsets)).size != 1:
+            raise BinaryException(
+                f"Binary file {fname} records are not consistent with "
+                f"array shape {data_shape}."
+            )
+        layer_strides = tuple(
+            int(np.prod(data_shape[i + 1:])) * numpy_type.itemsize
+            for i in range(1, len(data_shape))
+        )
+        data = np.ndarray(
+            data_shape,
+            dtype=numpy_type,
+            buffer=raw,
+            offset=int(offsets[0]),
+            strides=(int(offsets[1] - offsets[0]),) + layer_strides,
+        )
+        return data, headers
+
+    @profiling.profiled("BinaryArray.write_binary_array")
+    def write_binary_array(
+        self, fname, data, text="ARRAY", precision="double"
+    ):
+        """
+        Write an array to a MODFLOW 6 binary array file without model
+        information. Three-dimensional data is written with one record per
+        layer, other data with a single record.
+
+        Parameters
+        ----------
+        fname : str or PathLike
+            binary file name
+        data : np.ndarray
+            array data
+        text : str
+            record header text
+        precision : str
+            precision of the record header, "single" or "double"
+        """
+        layers = data if data.ndim == 3 else data[np.newaxis]
+        # all layer headers are built at once and written interleaved with
+        # the layers in a few large writes
+        headers = _array_headers(data.shape, text, precision)
+        profiling.annotate(fname)
+        with open(fname, "wb") as fd:
+            _write_records(fd, headers, layers)
 
     def _get_header(
         self,
@@ -92,7 +505,7 @@ class BinaryArray():
                     shape3d = modelgrid.nlay * modelgrid.nrow * modelgrid.ncol
                     if data.size == shape3d:
                         m1, m2, m3 = shape3d, 1, 1
-                return BinaryHeader.create(
+                return _create_header(
                     bintype="vardis",
                     precision=precision,
                     text=text,
@@ -112,7 +525,7 @@ class BinaryArray():
                     shape3d = modelgrid.nlay * modelgrid.ncpl
                     if data.size == shape3d:
                         m1, m2, m3 = shape3d, 1, 1
-                return BinaryHeader.create(
+                return _create_header(
                     bintype="vardisv",
                     precision=precision,
                     text=text,
@@ -126,7 +539,7 @@ class BinaryArray():
                 )
             elif modelgrid.grid_type == "unstructured":
                 m1, m2, m3 = modelgrid.nnodes, 1, 1
-                return BinaryHeader.create(
+                return _create_header(
                     bintype="vardisu",
                     precision=precision,
                     text=text,
@@ -142,7 +555,7 @@ class BinaryArray():
                 if ilay is None:
                     ilay = 1
                 m1, m2, m3 = 1, 1, ilay
-                header = BinaryHeader.create(
+                header = _create_header(
                     bintype="vardis",
                     precision=precision,
                     text=text,
@@ -158,7 +571,7 @@ class BinaryArray():
         else:
             m1, m2, m3 = 1, 1, 1
             pertim = np.float64(1.0)
-            header = BinaryHeader.create(
+            header = _create_header(
                 bintype="vardis",
                 precision=precision,
                 text=text,
@@ -173,59 +586,38 @@ class BinaryArray():
 
         return header
 
-    def _write_layer(
+    def _get_headers(
         self,
-        fd,
-        data,
         modelgrid,
         modeltime,
         stress_period,
         precision,
         text,
         fname,
-        ilay=None,
+        data,
     ):
-        header_data = self._get_header(
+        """
+        Headers of all layers of a layered array as one structured array.
+        The header of the first layer is built once and repeated with the
+        layer number updated.
+        """
+        header = self._get_header(
             modelgrid,
             modeltime,
             stress_period,
             precision,
             text,
             fname,
-            ilay=ilay,
-            data=data,
+            ilay=1,
+            data=data[0],
         )
-        header_data.tofile(fd)
-        data.tofile(fd)
-
-    def _read_binary_file_layer(
-        self, fd, fname, header_dtype, numpy_type, data_size, data_shape
-    ):
-        header_data = np.fromfile(fd, dtype=header_dtype, count=1)
-        data = np.fromfile(fd, dtype=numpy_type, count=data_size)
-        data = self._resolve_cellid_numbers_from_file(data)
-        if data.size != data_size:
-            message = (
-                "Binary file {} does not contain expected data. "
-                "Expected array size {} but found size "
-                "{}.".format(fname, data_size, data.size)
-            )
-            type_, value_, traceback_ = sys.exc_info()
-            raise BinaryException(
-                self._data_dimensions.structure.get_model(),
-                self._data_dimensions.structure.get_package(),
-                self._data_dimensions.structure.path,
-                "opening external file for writing",
-                self.structure.name,
-                inspect.stack()[0][3],
-                type_,
-                value_,
-                traceback_,
-                message,
-                self._simulation_data.debug,
-            )
-        return data.reshape(data_shape), header_data
+        headers = np.repeat(header, len(data))
+        if modelgrid is not None and modeltime is not None and \
+                modelgrid.grid_type != CommonNames.unstructured:
+            headers["m3"] = np.arange(1, len(data) + 1)
+        return headers
 
+    @profiling.profiled("BinaryArray.write_binary_file")
     def write_binary_file(
         self,
         data,
@@ -237,96 +629,323 @@ class BinaryArray():
         precision="double",
         write_multi_layer=False,
     ):
-        data = self._resolve_cellid_numbers_to_file(data)
-        fd = _open_ext_file(fname, binary=True, write=True)
-        if data.size == modelgrid.nnodes:
+        data = np.asarray(data)
+        if modelgrid is not None and data.size == modelgrid.nnodes:
             write_multi_layer = False
         if write_multi_layer:
-            # write data from each layer with a separate header
-            for layer, value in enumerate(data):
-                self._write_layer(
-                    fd,
-                    value,
-                    modelgrid,
-                    modeltime,
-                    stress_period,
-                    precision,
-                    text,
-                    fname,
-                    layer + 1,
-                )
-        else:
-            # write data with a single header
-            self._write_layer(
-                fd,
+            # one header per layer
+            headers = self._get_headers(
+                modelgrid,
+                modeltime,
+                stress_period,
+                precision,
+                text,
+                fname,
                 data,
+            )
+            layers = data
+        else:
+            # all data with a single header
+            headers = self._get_header(
                 modelgrid,
                 modeltime,
                 stress_period,
                 precision,
                 text,
                 fname,
+                data=data,
             )
-        fd.close()
+            layers = data[np.newaxis]
+        profiling.annotate(fname)
+        fd = _open_ext_file(fname, binary=True, write=True)
+        try:
+            _write_records(fd, headers, layers)
+        finally:
+            fd.close()
 
 
 class BinaryList():
-    def __init__(self):
-        pass
+    def __init__(self, fields=None):
+        """
+        Reader and writer for MODFLOW 6 binary list files
 
+        Parameters
+        ----------
+        fields : list of (str, np.dtype), optional
+            names and data types of the fields that follow the cellid in
+            each record. Floating point fields are stored with the
+            precision of the file.
+        """
+        if fields is None:
+            fields = []
+        self._fields = fields
+
+    @profiling.profiled("BinaryList.read_binary_data_from_file")
     def read_binary_data_from_file(
         self, read_file, modelgrid, precision="double", build_cellid=True
     ):
-        # read from file
-        header, int_cellid_indexes, ext_cellid_indexes = self._get_header(
-            modelgrid, precision
-        )
+        """
+        Read a binary list file into a structured array
+
+        The records are read with a single np.fromfile call. When
+        build_cellid is True the 1-based cellid columns are converted to
+        0-based indices in place; no per-record Python objects are built.
+
+        Parameters
+        ----------
+        read_file : str, PathLike, or file object
+        modelgrid : flopy Grid object
+        precision : str
+            "single" or "double"
+        build_cellid : bool
+            convert the cellid columns to 0-based indices
+
+        Returns
+        -------
+            np.ndarray : structured array with one column per cellid
+            component and per field
+        """
+        header = self._get_header(modelgrid, precision)
+        profiling.annotate(getattr(read_file, "name", read_file))
         file_array = np.fromfile(read_file, dtype=header, count=-1)
+        profiling.count(bytes_read=file_array.nbytes, values=file_array.size)
+        profiling.allocated(file_array)
         if not build_cellid:
             return file_array
-        # build data list for recarray
-        cellid_size = len(self._get_cell_header(modelgrid))
-        data_list = []
-        for record in file_array:
-            data_record = ()
-            current_cellid_size = 0
-            current_cellid = ()
-            for index, data_item in enumerate(record):
-                if index in ext_cellid_indexes:
-                    current_cellid += (data_item - 1,)
-                    current_cellid_size += 1
-                    if current_cellid_size == cellid_size:
-                        data_record += current_cellid
-                        data_record = (data_record,)
-                        current_cellid = ()
-                        current_cellid_size = 0
-                else:
-                    data_record += (data_item,)
-            data_list.append(data_record)
-        return data_list
+        for name, _ in self._get_cell_header(modelgrid):
+            file_array[name] -= 1
+        return file_array
 
+    @profiling.profiled("BinaryList.write_binary_file")
     def write_binary_file(
         self, data, fname, modelgrid=None, precision="double"
     ):
+        profiling.annotate(fname)
         fd = _open_ext_file(fname, binary=True, write=True)
-        data_array = self._build_data_array(data, modelgrid, precision)
+        data_array = profiling.allocated(
+            self._build_data_array(data, modelgrid, precision)
+        )
         data_array.tofile(fd)
+        profiling.count(
+            bytes_written=data_array.nbytes, values=data_array.size
+        )
         fd.close()
 
-    def _get_cell_header(self, modelgrid):
-        if modelgrid.grid_type == "structured":
-            return [("layer", np.int32), ("row", np.int32), ("col", np.int32)]
-        elif modelgrid.grid_type == "vertex":
-            return [("layer", np.int32), ("ncpl", np.int32)]
+    def _get_header(self, modelgrid, precision):
+        """
+        Record dtype of the binary list file
+        """
+        if precision == "double":
+            float_type = np.float64
         else:
-            return [("nodes", np.int32)]
+            float_type = np.float32
+        header = self._get_cell_header(modelgrid)
+        for name, dtype in self._fields:
+            if np.issubdtype(dtype, np.floating):
+                dtype = float_type
+            header.append((name, dtype))
+        return np.dtype(header)
 
+    def _build_data_array(self, data, modelgrid, precision):
+        """
+        Convert a structured array or DataFrame with 0-based cellid columns
+        to the binary record layout with 1-based cellids.
+        """
+        if hasattr(data, "to_records"):
+            data = data.to_records(index=False)
+        header = self._get_header(modelgrid, precision)
+        data_array = np.empty(len(data), dtype=header)
+        for name in header.names:
+            data_array[name] = data[name]
+        for name, _ in self._get_cell_header(modelgrid):
+            data_array[name] += 1
+        return data_array
 
-def _open_ext_file(fname, binary=False, write=False):
-    model_dim = self._data_dimensions.package_dim.model_dim[0]
-    read_file = self._simulation_data.mfpath.resolve_path(
-        fname, model_dim.model_name
+    def _get_cell_header(self, modelgrid):
+        return cellid_dtype(modelgrid.grid_type)
+
+
+def cellid_dtype(grid_type):
+    """
+    Names and data types of the cellid components for a grid type
+
+    Parameters
+    ----------
+    grid_type : str
+        "structured", "vertex", or "unstructured"
+
+    Returns
+    -------
+        list of (str, np.dtype)
+    """
+    if grid_type == CommonNames.structured:
+        return [("layer", np.int32), ("row", np.int32), ("col", np.int32)]
+    elif grid_type == CommonNames.vertex:
+        return [("layer", np.int32), ("ncpl", np.int32)]
+    else:
+        return [("nodes", np.int32)]
+
+
+def _array_headers(shape, text="ARRAY", precision="double"):
+    """
+    Record headers of an array written without model information, one
+    record per layer for three-dimensional shapes and a single record
+    otherwise
+
+    Parameters
+    ----------
+    shape : tuple
+        array shape
+    text : str
+        record header text
+    precision : str
+        "single" or "double"
+
+    Returns
+    -------
+        np.ndarray : structured array of headers
+    """
+    if len(shape) == 3:
+        nlay, m1, m2 = shape[0], shape[2], shape[1]
+    elif len(shape) == 2:
+        nlay, m1, m2 = 1, shape[1], shape[0]
+    else:
+        nlay, m1, m2 = 1, int(np.prod(shape)), 1
+    header = _create_header(
+        bintype="vardis",
+        precision=precision,
+        text=text,
+        m1=m1,
+        m2=m2,
+        m3=1,
+        pertim=1.,
+        totim=1.,
+        kstp=1,
+        kper=1,
+    )
+    headers = np.repeat(header, nlay)
+    headers["m3"] = np.arange(1, nlay + 1)
+    return headers
+
+
+def _write_records(fd, headers, data):
+    """
+    Write records of a header followed by values. Headers and values are
+    interleaved into one contiguous buffer of about CHUNKSIZE values, so a
+    file is written with a few large sequential writes instead of two
+    writes per record.
+
+    Parameters
+    ----------
+    fd : file object
+        binary file opened for writing
+    headers : np.ndarray
+        structured array with one header per record
+    data : np.ndarray
+        record values with the record number as the first dimension
+    """
+    headers = np.atleast_1d(headers)
+    data = np.asarray(data)
+    record_dtype = np.dtype(
+        [("header", headers.dtype), ("data", data.dtype, data.shape[1:])]
     )
+    nrec = len(headers)
+    step = max(CHUNKSIZE // max(int(np.prod(data.shape[1:])), 1), 1)
+    buffer = profiling.allocated(
+        np.empty(min(step, nrec), dtype=record_dtype)
+    )
+    for start in range(0, nrec, step):
+        stop = min(start + step, nrec)
+        records = buffer[:stop - start]
+        records["header"] = headers[start:stop]
+        records["data"] = data[start:stop]
+        records.tofile(fd)
+        profiling.count(
+            bytes_written=records.nbytes, values=records["data"].size
+        )
+
+
+def _header_dtype(bintype="vardis", precision="double"):
+    """
+    Record header dtype of a MODFLOW 6 binary array file, equal to
+    flopy.utils.binaryfile.BinaryHeader.set_dtype. The vardis, vardisv, and
+    vardisu headers share one layout.
+    """
+    if bintype not in ("vardis", "vardisv", "vardisu"):
+        raise BinaryException(f"Unsupported binary header type {bintype}.")
+    float_type = "<f8" if precision == "double" else "<f4"
+    return np.dtype(
+        [
+            ("kstp", "<i4"),
+            ("kper", "<i4"),
+            ("pertim", float_type),
+            ("totim", float_type),
+            ("text", "S16"),
+            ("m1", "<i4"),
+            ("m2", "<i4"),
+            ("m3", "<i4"),
+        ]
+    )
+
+
+def _create_header(bintype="vardis", precision="double", text=None, **kwargs):
+    """
+    Record header of a MODFLOW 6 binary array file, equal to
+    flopy.utils.binaryfile.BinaryHeader.create. The text is upper case and
+    padded or trimmed to 16 characters.
+    """
+    header = np.zeros(1, dtype=_header_dtype(bintype, precision))
+    for name, value in kwargs.items():
+        header[0][name] = value
+    text = "DUMMY TEXT" if text is None else f"{text.upper():<16}"[:16]
+    header[0]["text"] = text
+    return header[0]
+
+
+def _bintype(grid_type):
+    """
+    Binary header type for a grid type
+    """
+    if grid_type == CommonNames.vertex:
+        return "vardisv"
+    elif grid_type == CommonNames.unstructured:
+        return "vardisu"
+    return "vardis"
+
+
+def _detect_precision(fname, size, data_type=None):
+    """
+    Header precision of a binary array file. The first header is read with
+    each precision and the one with a printable text field and a record
+    that fits in the file is returned.
+    """
+    for precision in ("double", "single"):
+        header_dtype = _header_dtype(
+            bintype="vardis", precision=precision
+        )
+        if size < header_dtype.itemsize:
+            continue
+        header = np.fromfile(fname, dtype=header_dtype, count=1)[0]
+        text = header["text"]
+        if not text or not all(32 <= c < 127 for c in text):
+            continue
+        itemsize = np.dtype(
+            data_type if data_type is not None else
+            np.float64 if precision == "double" else np.float32
+        ).itemsize
+        m1, m2 = int(header["m1"]), int(header["m2"])
+        if m1 >= 0 and m2 >= 0 and \
+                header_dtype.itemsize + m1 * m2 * itemsize <= size:
+            return precision
+    raise BinaryException(
+        f"Unable to determine the header precision of binary file {fname}."
+    )
+
+
+def _open_ext_file(fname, binary=False, write=False):
+    """
+    Open a file, raising a BinaryException if it cannot be opened
+    """
     if write:
         options = "w"
     else:
@@ -334,25 +953,10 @@ def _open_ext_file(fname, binary=False, write=False):
     if binary:
         options = f"{options}b"
     try:
-        fd = open(read_file, options)
-        return fd
-    except:
-        message = (
-            "Unable to open file {} in mode {}.  Make sure the "
-            "file is not locked and the folder exists"
-            ".".format(read_file, options)
-        )
-        type_, value_, traceback_ = sys.exc_info()
+        fd = open(fname, options)
+    except OSError as e:
         raise BinaryException(
-            self._data_dimensions.structure.get_model(),
-            self._data_dimensions.structure.get_package(),
-            self._data_dimensions.structure.path,
-            "opening external file for writing",
-            self._data_dimensions.structure.name,
-            inspect.stack()[0][3],
-            type_,
-            value_,
-            traceback_,
-            message,
-            self._simulation_data.debug,
-        )
\ No newline at end of file
+            f"Unable to open file {fname} in mode {options}. Make sure the "
+            f"file is not locked and the folder exists."
+        ) from e
+    return fd
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
+from pathlib import Path
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed external array files
+
+    Parsed values are stored as .npy files in a cache directory. An entry
+    is keyed by the resolved path of the source file and its size and
+    modification time, or optionally by a hash of the file contents.
+    Entries that are not used are evicted, least recently used first, when
+    the cache grows beyond max_size.
+
+    Parameters
+    ----------
+    directory : str or PathLike
+        cache directory, created if it does not exist
+    max_size : int, optional
+        maximum total size of the cache entries in bytes. By default the
+        cache is not limited
+    use_hash : bool
+        key entries by a hash of the file contents instead of the file
+        size and modification time. Hashing reads the whole file but is
+        robust to files that are rewritten with identical contents or
+        copied with a new modification time
+    """
+    suffix = ".npy"
+
+    def __init__(self, directory, max_size=None, use_hash=False):
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._max_size = max_size
+        self._use_hash = use_hash
+
+    @property
+    def directory(self):
+        """
+        Returns
+        -------
+            Path : cache directory
+        """
+        return self._directory
+
+    def _entry(self, fpath):
+        """
+        Cache entry path for a source file
+        """
+        fpath = Path(fpath).resolve()
+        if self._use_hash:
+            digest = hashlib.blake2b(digest_size=16)
+            with open(fpath, "rb") as foo:
+                for block in iter(lambda: foo.read(2 ** 20), b""):
+                    digest.update(block)
+            key = f"{fpath}:{digest.hexdigest()}"
+        else:
+            stat = fpath.stat()
+            key = f"{fpath}:{stat.st_size}:{stat.st_mtime_ns}"
+        name = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return self._directory / f"{name}{self.suffix}"
+
+    def get(self, fpath):
+        """
+        Get the cached values of a source file
+
+        Parameters
+        ----------
+        fpath : str or PathLike
+            source file path
+
+        Returns
+        -------
+            np.ndarray or None if the file is not in the cache
+        """
+        entry = self._entry(fpath)
+        try:
+            array = np.load(entry)
+        except (OSError, ValueError):
+            return None
+        # mark the entry as recently used
+        try:
+            os.utime(entry)
+        except FileNotFoundError:
+            pass
+        return array
+
+    def put(self, fpath, array):
+        """
+        Store the parsed values of a source file
+
+        Parameters
+        ----------
+        fpath : str or PathLike
+            source file path
+        array : np.ndarray
+            parsed values
+        """
+        entry = self._entry(fpath)
+        # write to a temporary file first so concurrent readers never see
+        # a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as foo:
+            np.save(foo, array)
+        os.replace(tmp, entry)
+        self._evict()
+
+    def size(self):
+        """
+        Returns
+        -------
+            int : total size of the cache entries in bytes
+        """
+        return sum(
+            entry.stat().st_size
+            for entry in self._directory.glob(f"*{self.suffix}")
+        )
+
+    def clear(self):
+        """
+        Remove all cache entries
+        """
+        for entry in self._directory.glob(f"*{self.suffix}"):
+            entry.unlink(missing_ok=True)
+
+    def _evict(self):
+        """
+        Remove the least recently used entries until the cache fits in
+        max_size
+        """
+        if self._max_size is None:
+            return
+        entries = []
+        total = 0
+        for entry in self._directory.glob(f"*{self.suffix}"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+            total += stat.st_size
+        entries.sort()
+        for _, size, entry in entries:
+            if total <= self._max_size:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
@@ -5,6 +5,8 @@ class How(Enum):
     internal = "INTERNAL"
     constant = "CONSTANT"
     external = "OPEN/CLOSE"
+    # base value with sparse exceptions, written as INTERNAL
+    sparse = "SPARSE"
 
     @classmethod
     def to_string(cls, how):
@@ -22,6 +24,9 @@ class CommonNames:
     internal = "INTERNAL"
     constant = "CONSTANT"
     external = "OPEN/CLOSE"
+    binary = "(BINARY)"
+    factor = "FACTOR"
+    boundname = "boundname"
     format = "FORMAT"
     structured = "structured"
     vertex = "vertex"
@@ -0,0 +1,142 @@
+"""
+Lightweight copies of the flopy.datbase interfaces. Importing flopy.datbase
+imports the whole flopy package, which dominates the import time of
+flopy4.data.
+
+The export and plot code of flopy recognizes data objects with isinstance
+checks against the flopy.datbase classes. To keep MFArray and MFList
+recognized, the interfaces become subclasses of the flopy.datbase
+interfaces as soon as flopy.datbase is imported, whether flopy was
+imported before or after flopy4.data.
+"""
+import abc
+import sys
+from enum import Enum
+
+
+class DataType(Enum):
+    array2d = 1
+    array3d = 2
+    transient2d = 3
+    transient3d = 4
+    list = 5
+    transientlist = 6
+    scalar = 7
+    transientscalar = 8
+
+
+class _Interface:
+    """
+    Base of the interfaces. The base of a class can only be replaced when
+    it is not object.
+    """
+
+
+class DataInterface(_Interface):
+    @property
+    @abc.abstractmethod
+    def data_type(self):
+        raise NotImplementedError(
+            "must define data_type in child class to use this base class"
+        )
+
+    @property
+    @abc.abstractmethod
+    def dtype(self):
+        raise NotImplementedError(
+            "must define dtype in child class to use this base class"
+        )
+
+    @property
+    @abc.abstractmethod
+    def array(self):
+        raise NotImplementedError(
+            "must define array in child class to use this base class"
+        )
+
+    @property
+    @abc.abstractmethod
+    def name(self):
+        raise NotImplementedError(
+            "must define name in child class to use this base class"
+        )
+
+    @property
+    @abc.abstractmethod
+    def model(self):
+        raise NotImplementedError(
+            "must define model in child class to use this base class"
+        )
+
+    @property
+    @abc.abstractmethod
+    def plottable(self):
+        raise NotImplementedError(
+            "must define plottable in child class to use this base class"
+        )
+
+
+class DataListInterface(_Interface):
+    @property
+    @abc.abstractmethod
+    def package(self):
+        raise NotImplementedError(
+            "must define package in child class to use this base class"
+        )
+
+    @abc.abstractmethod
+    def to_array(self, kper=0, mask=False):
+        raise NotImplementedError(
+            "must define to_array in child class to use this base class"
+        )
+
+    @abc.abstractmethod
+    def masked_4D_arrays_itr(self):
+        raise NotImplementedError(
+            "must define masked_4D_arrays_itr in child class to use this base "
+            "class"
+        )
+
+
+class _FlopyFinder:
+    """
+    Import system finder that links the interfaces to flopy.datbase when
+    flopy.datbase is imported
+    """
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname != "flopy.datbase":
+            return None
+        sys.meta_path.remove(self)
+        import importlib.util
+
+        spec = importlib.util.find_spec(fullname)
+        if spec is None or spec.loader is None:
+            return spec
+        exec_module = spec.loader.exec_module
+
+        def exec_and_link(module):
+            exec_module(module)
+            _link(module)
+
+        spec.loader.exec_module = exec_and_link
+        return spec
+
+
+def _link(datbase):
+    """
+    Make the interfaces subclasses of the flopy.datbase interfaces
+
+    Parameters
+    ----------
+    datbase : module
+        flopy.datbase
+    """
+    DataInterface.__bases__ = (datbase.DataInterface,)
+    DataListInterface.__bases__ = (datbase.DataListInterface,)
+
+
+if "flopy.datbase" in sys.modules:
+    _link(sys.modules["flopy.datbase"])
+else:
+    sys.meta_path.insert(0, _FlopyFinder())
+
@@ -0,0 +1,348 @@
+import numpy as np
+from pathlib import Path
+from . import profiling
+from .binary import BinaryRecords, _array_headers, _write_records
+from .constants import How, CommonNames
+from .mfarray import MFArray, array_to_f, _default_fmt, _precision
+from .readers import iter_array_block
+
+
+class MFArrayEnsemble:
+    """
+    Realizations of an array, like hydraulic conductivity fields of a
+    Monte Carlo run, stored in one contiguous array with the realization
+    number as the leading axis
+
+    The spatial shape, factor, and data type are shared by all
+    realizations. Reductions are vectorized across the realization and
+    spatial axes, and every realization is written to its own OPEN/CLOSE
+    file in a single pass.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        (nreal,) + shape array of values without the factor applied
+    factor : float, optional
+        multiplier of all realizations
+    dtype : np.dtype, optional
+        data type of the values, by default the type of array
+
+    Examples
+    --------
+    >>> rng = np.random.default_rng(0)
+    >>> ens = MFArrayEnsemble(rng.lognormal(size=(100, 3, 50, 50)))
+    >>> mean_field = ens.mean(axis=0)
+    >>> realization_means = ens.mean(axis=ens.spatial_axes)
+    >>> records = ens.write("hk_{:03d}.bin", cwd, binary=True)
+    """
+    def __init__(self, array, factor=None, dtype=None):
+        if dtype is None:
+            dtype = np.asarray(array).dtype
+        self._dtype = np.dtype(dtype)
+        self._array = np.ascontiguousarray(array, dtype=self._dtype)
+        if self._array.ndim < 2:
+            raise ValueError(
+                "ensemble array needs a realization axis and at least one "
+                "spatial axis"
+            )
+        self._factor = factor
+
+    @classmethod
+    def from_mfarrays(cls, arrays, dtype=None):
+        """
+        Build an ensemble from MFArrays of the same shape. The values of
+        each array, with its factor applied, are copied into the ensemble.
+
+        Parameters
+        ----------
+        arrays : list of MFArray
+        dtype : np.dtype, optional
+            data type, by default the type of the first array
+
+        Returns
+        -------
+            MFArrayEnsemble
+        """
+        if dtype is None:
+            dtype = arrays[0].dtype
+        array = np.empty((len(arrays),) + tuple(arrays[0]._shape), dtype)
+        for out, mfa in zip(array, arrays):
+            out[...] = mfa.values
+        return cls(array, dtype=dtype)
+
+    @classmethod
+    @profiling.profiled("MFArrayEnsemble.load")
+    def load(cls, fpaths, shape, binary=False, factor=None, dtype=None):
+        """
+        Load one realization from each OPEN/CLOSE file. The values are
+        parsed or copied directly into the ensemble array, without a
+        separate array per realization.
+
+        Parameters
+        ----------
+        fpaths : list of str or PathLike
+            external file of every realization
+        shape : tuple
+            shape of a realization
+        binary : bool
+            the files are MODFLOW 6 binary array files
+        factor : float, optional
+            multiplier of all realizations
+        dtype : np.dtype, optional
+            data type the values are read into. Defaults to np.float64
+
+        Returns
+        -------
+            MFArrayEnsemble
+        """
+        dtype = np.dtype(np.float64 if dtype is None else dtype)
+        count = int(np.prod(shape))
+        array = profiling.allocated(
+            np.empty((len(fpaths),) + tuple(shape), dtype=dtype)
+        )
+        for out, fpath in zip(array.reshape(len(fpaths), count), fpaths):
+            if binary:
+                _read_binary(fpath, out, dtype)
+            else:
+                _read_text(fpath, out, dtype)
+        return cls(array, factor=factor, dtype=dtype)
+
+    def __len__(self):
+        return self._array.shape[0]
+
+    def __iter__(self):
+        for ix in range(len(self)):
+            yield self[ix]
+
+    def __getitem__(self, item):
+        """
+        A realization as an INTERNAL MFArray that shares memory with the
+        ensemble, or a sub-ensemble for a slice or sequence of realizations
+        """
+        if isinstance(item, (int, np.integer)):
+            return MFArray(
+                self._array[item].reshape(-1),
+                self.shape,
+                How.internal,
+                factor=self._factor,
+                dtype=self._dtype,
+            )
+        return MFArrayEnsemble(
+            self._array[item], factor=self._factor, dtype=self._dtype
+        )
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.values
+        return self.values.astype(dtype, copy=False)
+
+    @property
+    def nreal(self):
+        """
+        Returns
+        -------
+            int : number of realizations
+        """
+        return self._array.shape[0]
+
+    @property
+    def shape(self):
+        """
+        Returns
+        -------
+            tuple : shape of a realization
+        """
+        return self._array.shape[1:]
+
+    @property
+    def spatial_axes(self):
+        """
+        Returns
+        -------
+            tuple : axes of a realization, for reductions per realization
+        """
+        return tuple(range(1, self._array.ndim))
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def factor(self):
+        if self._factor is None:
+            return self._dtype.type(1)
+        return self._factor
+
+    @property
+    def raw_values(self):
+        """
+        Values of all realizations without the factor applied, as the
+        ensemble storage itself
+
+        Returns
+        -------
+            np.ndarray
+        """
+        return self._array
+
+    @property
+    def values(self):
+        """
+        Values of all realizations with the factor applied. When the factor
+        is 1 the ensemble storage is returned.
+
+        Returns
+        -------
+            np.ndarray
+        """
+        if self.factor == 1:
+            return self._array
+        return profiling.allocated(self._array * self.factor)
+
+    def min(self, axis=None):
+        return self._reduce("min", axis)
+
+    def max(self, axis=None):
+        return self._reduce("max", axis)
+
+    def mean(self, axis=None):
+        return self._reduce("mean", axis)
+
+    def median(self, axis=None):
+        return self._reduce("median", axis)
+
+    def std(self, axis=None):
+        return self._reduce("std", axis)
+
+    def sum(self, axis=None):
+        return self._reduce("sum", axis)
+
+    def _reduce(self, name, axis):
+        """
+        Reduce the raw values and apply the factor to the result, so the
+        factor is never applied to the whole ensemble. nan values are
+        ignored like in the MFArray reductions.
+
+        Parameters
+        ----------
+        name : str
+            numpy reduction
+        axis : int or tuple of int, optional
+            axes to reduce. 0 reduces across the realizations, spatial_axes
+            within each realization, and None over all values
+        """
+        factor = self.factor
+        if name in ("min", "max") and factor < 0:
+            name = "max" if name == "min" else "min"
+        if np.issubdtype(self._dtype, np.inexact) and \
+                np.isnan(np.add.reduce(self._array, axis=None)):
+            # only take the slower nan-aware path when there are nan values
+            name = f"nan{name}"
+        result = getattr(np, name)(self._array, axis=axis)
+        if factor == 1:
+            return result
+        if name.endswith("std"):
+            return result * abs(factor)
+        return result * factor
+
+    @profiling.profiled("MFArrayEnsemble.write")
+    def write(
+        self, fnames, cwd=None, binary=False, values_per_line=10, fmt=None
+    ):
+        """
+        Write every realization to its own OPEN/CLOSE file in one pass.
+        Binary record headers are built once and shared by all files.
+
+        Parameters
+        ----------
+        fnames : str or list of str
+            file name of every realization, or a pattern like
+            "hk_{:03d}.txt" that is formatted with the one-based
+            realization number
+        cwd : Path, optional
+            directory the file names are relative to
+        binary : bool
+            write MODFLOW 6 binary array files
+        values_per_line : int
+            number of values written on each line of text files
+        fmt : str, optional
+            printf style format of a single value of text files
+
+        Returns
+        -------
+            list of str : OPEN/CLOSE control record of every realization,
+            for the package file of its simulation
+        """
+        if isinstance(fnames, str):
+            fnames = [fnames.format(ix + 1) for ix in range(len(self))]
+        if len(fnames) != len(self):
+            raise ValueError(
+                f"Expected {len(self)} file names but found {len(fnames)}"
+            )
+        cwd = Path("." if cwd is None else cwd)
+        if fmt is None:
+            fmt = _default_fmt(self._dtype)
+
+        headers = None
+        if binary:
+            headers = _array_headers(
+                self.shape, precision=_precision(self._dtype)
+            )
+        records = []
+        for values, fname in zip(self._array, fnames):
+            if binary:
+                layers = values if values.ndim == 3 else values[np.newaxis]
+                with open(cwd / fname, "wb") as fd:
+                    _write_records(fd, headers, layers)
+            else:
+                with open(cwd / fname, "w") as foo:
+                    array_to_f(
+                        foo, values, values_per_line=values_per_line, fmt=fmt
+                    )
+            records.append(self._control_record(fname, binary))
+        return records
+
+    def _control_record(self, fname, binary):
+        record = f"{CommonNames.external} {fname}"
+        if binary:
+            record = f"{record} {CommonNames.binary}"
+        if self._factor is not None:
+            record = f"{record} {CommonNames.factor} {self._factor}"
+        return record
+
+
+def _read_text(fpath, out, dtype):
+    """
+    Parse a text OPEN/CLOSE file into a flat output array chunk by chunk
+    """
+    profiling.annotate(fpath)
+    nread = 0
+    with open(fpath) as foo:
+        for values in iter_array_block(foo, dtype=dtype):
+            if nread + values.size > out.size:
+                nread += values.size
+                break
+            out[nread:nread + values.size] = values
+            nread += values.size
+    if nread != out.size:
+        raise ValueError(
+            f"Expected {out.size} values in {fpath} but found "
+            f"{'more' if nread > out.size else nread}"
+        )
+
+
+def _read_binary(fpath, out, dtype):
+    """
+    Copy the records of a binary array file into a flat output array
+    """
+    profiling.annotate(fpath)
+    records = BinaryRecords(
+        fpath, data_type=dtype, precision=_precision(dtype)
+    )
+    data = records.memmap(mode="r")
+    if data.size != out.size:
+        raise ValueError(
+            f"Expected {out.size} values in {fpath} but found {data.size}"
+        )
+    out.reshape(data.shape)[...] = data
+    profiling.count(bytes_read=data.nbytes, values=data.size)
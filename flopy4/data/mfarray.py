@@ -1,59 +1,202 @@
+import os
+import shutil
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from io import StringIO
 from .constants import How, CommonNames
-from .mixins import MFArrayMixins
-from flopy.datbase import DataType, DataInterface
-from flopy.utils.flopy_io import multi_line_strip, line_strip
+from . import profiling
+from .binary import BinaryArray
+from .datbase import DataInterface
+from .mixins import MFArrayMixins, CHUNKSIZE
+from .readers import read_array_block, iter_array_block, multi_line_strip
+from .sparse import SparseValues, SPARSE_THRESHOLD
+from .writers import write_array_block, all_equal
 
 
 class MFArray(DataInterface, MFArrayMixins):
     """
 
     """
-    def __init__(self, array, shape, how, factor=None, layered=False):
+    def __init__(
+        self,
+        array,
+        shape,
+        how,
+        factor=None,
+        layered=False,
+        path=None,
+        binary=False,
+        fname=None,
+        dtype=None,
+    ):
         super().__init__()
-        self._flat = array
+        if dtype is None:
+            dtype = np.float64
+        self._dtype = np.dtype(dtype)
+        self._array = array
         self._shape = shape
         self._how = how
         self._factor = factor
         self._is_layered = layered
+        self._path = path
+        self._binary = binary
+        self._fname = fname
+        self._cache = None
+        self._row = None
+        self._buffer = None
+        if layered:
+            self._buffer = self._consolidate()
 
     @property
-    def values(self):
+    def _flat(self):
+        """
+        Flat array storage. Lazily loaded external arrays are parsed from
+        file the first time the storage is accessed.
+
+        Returns
+        -------
+            np.ndarray, float, or np.ndarray of MFArray objects (layered)
+        """
+        if self._array is None and self._path is not None:
+            array = _load_external(
+                self._path,
+                int(np.prod(self._shape)),
+                cache=self._cache,
+                dtype=self._dtype,
+            )
+            if self._row is not None:
+                # layer of a layered array, store in the shared buffer
+                self._row[:] = array
+                array = self._row
+            self._array = array
+        return self._array
+
+    @_flat.setter
+    def _flat(self, array):
+        self._array = array
+
+    @property
+    def dtype(self):
         """
+        Data type of the array values, for example int32 for IDOMAIN
 
         Returns
         -------
+            np.dtype
+        """
+        return self._dtype
 
+    @property
+    def is_loaded(self):
+        """
+        Boolean flag that is False for lazily loaded external arrays that
+        have not been read from file yet.
+
+        Returns
+        -------
+            bool
         """
         if self._is_layered:
-            arr = []
-            for mfa in self._flat:
-                arr.append(mfa.values)
-            return np.array(arr)
+            return all(mfa.is_loaded for mfa in self._array)
+        return self._array is not None
+
+    def _consolidate(self):
+        """
+        Move the INTERNAL and OPEN/CLOSE text layers of a layered array into
+        a single contiguous (nlay, ncpl) buffer. Each layer's flat storage
+        becomes a view of its buffer row. Rows of CONSTANT and sparse
+        layers are reserved and only filled when the layer is promoted to
+        INTERNAL, rows of binary layers are left untouched, and lazily
+        loaded layers are read into their row on first access.
+
+        Returns
+        -------
+            np.ndarray
+        """
+        nlay = len(self._array)
+        ncpl = int(np.prod(self._shape[1:]))
+        buffer = np.empty((nlay, ncpl), dtype=self._dtype)
+        for ix, mfa in enumerate(self._array):
+            if mfa._binary:
+                continue
+            mfa._row = buffer[ix]
+            if isinstance(mfa._array, np.ndarray):
+                buffer[ix] = mfa._array
+                mfa._array = buffer[ix]
+        return buffer
+
+    def _is_buffered(self):
+        """
+        Check if every layer of a layered array is stored in the shared
+        buffer, so the buffer can be returned as a view.
+
+        Returns
+        -------
+            bool
+        """
+        for mfa in self._flat:
+            array = mfa._flat
+            if not isinstance(array, np.ndarray) or \
+                    array.base is not self._buffer:
+                return False
+        return True
+
+    @property
+    @profiling.profiled("MFArray.values")
+    def values(self):
+        """
+        Array values with the factor applied. When the factor is 1 a view
+        of the storage is returned where possible.
+
+        Returns
+        -------
+            np.ndarray
+        """
+        if self._is_layered:
+            factor = np.array(self.factor)
+            if np.all(factor == 1):
+                return self.raw_values
+            factor = factor.reshape((-1,) + (1,) * (len(self._shape) - 1))
+            return profiling.allocated(
+                (self.raw_values * factor).astype(self._dtype, copy=False)
+            )
 
         if self._how == How.constant:
-            return np.ones(self._shape) * self._flat * self.factor
+            return profiling.allocated(np.full(
+                self._shape, self._flat * self.factor, dtype=self._dtype
+            ))
+        elif self.factor == 1.:
+            return self.raw_values
         else:
-            return self._flat.reshape(self._shape) * self.factor
+            return profiling.allocated(self.raw_values * self.factor)
 
     @property
+    @profiling.profiled("MFArray.raw_values")
     def raw_values(self):
         """
+        Array values without the factor applied. INTERNAL and OPEN/CLOSE
+        data is returned as a view of the storage.
 
         Returns
         -------
-
+            np.ndarray
         """
         if self._is_layered:
-            arr = []
-            for mfa in self._flat:
-                arr.append(mfa.raw_values)
-            return np.array(arr)
+            if self._is_buffered():
+                return self._buffer.reshape(self._shape)
+            arr = profiling.allocated(np.empty(self._shape, dtype=self._dtype))
+            for ix, mfa in enumerate(self._flat):
+                arr[ix] = mfa.raw_values
+            return arr
 
         if self._how == How.constant:
-            return np.ones(self._shape) * self._flat
+            return profiling.allocated(
+                np.full(self._shape, self._flat, dtype=self._dtype)
+            )
+        elif self._how == How.sparse:
+            return profiling.allocated(
+                self._flat.toarray().reshape(self._shape)
+            )
         else:
             return self._flat.reshape(self._shape)
 
@@ -71,7 +214,7 @@ class MFArray(DataInterface, MFArrayMixins):
 
         factor = self._factor
         if self._factor is None:
-            factor = 1.
+            factor = self._dtype.type(1)
         return factor
 
     @property
@@ -88,8 +231,45 @@ class MFArray(DataInterface, MFArrayMixins):
 
         return self._how
 
+    @property
+    def control_record(self):
+        """
+        Control record that describes how the array is written to file,
+        for example "CONSTANT 10.0" or "OPEN/CLOSE hk.txt FACTOR 0.1"
+
+        Returns
+        -------
+            str or list of str (layered)
+        """
+        if self._is_layered:
+            return [mfa.control_record for mfa in self._flat]
+
+        if self._how == How.constant:
+            # MODFLOW 6 does not support a FACTOR for CONSTANT
+            return f"{CommonNames.constant} {self._flat * self.factor}"
+
+        if self._how == How.external:
+            record = f"{CommonNames.external} {self._fname}"
+            if self._binary:
+                record = f"{record} {CommonNames.binary}"
+        elif self._how == How.sparse:
+            record = CommonNames.internal
+        else:
+            record = How.to_string(self._how)
+
+        if self._factor is not None:
+            record = f"{record} {CommonNames.factor} {self._factor}"
+        return record
+
+    def __str__(self):
+        if self._is_layered:
+            return "\n".join(self.control_record)
+        return self.control_record
+
     def __getitem__(self, item):
         """
+        Index the raw array values. Layered arrays index directly into the
+        selected layer, and CONSTANT arrays only build the selected slice.
 
         Parameters
         ----------
@@ -99,38 +279,258 @@ class MFArray(DataInterface, MFArrayMixins):
         -------
 
         """
+        if self._is_layered:
+            if isinstance(item, (int, np.integer)):
+                return self._flat[item].raw_values
+            elif isinstance(item, tuple) and item and \
+                    isinstance(item[0], (int, np.integer)):
+                return self._flat[item[0]][item[1:]]
+
+        elif self._how == How.constant:
+            return np.broadcast_to(self._flat, self._shape)[item].copy()
+
+        elif self._how == How.sparse:
+            values = self._flat.take(self._shape, item)
+            if values is not None:
+                return values
+
         return self.raw_values[item]
 
     def __setitem__(self, key, value):
         """
+        Set raw array values in place. Only the selected cells are written:
+        layered arrays update the selected layers, and a CONSTANT array or
+        layer that is patched in a few cells stores the patch as sparse
+        exceptions to the constant. Sparse arrays are expanded to INTERNAL
+        storage when more than SPARSE_THRESHOLD of the cells differ from
+        the base value, and selections of more than SPARSE_THRESHOLD of the
+        cells are assigned to INTERNAL storage directly.
 
         Parameters
         ----------
         key
+            index or slice of the cells to set
         value
+            scalar or array broadcastable to the selection
+        """
+        if self._is_layered:
+            split = _split_layer_key(key, self._shape[0])
+            if split is None:
+                # advanced indexing across layers, update every layer
+                values = self.raw_values
+                values[key] = value
+                for ix, mfa in enumerate(self._flat):
+                    mfa[...] = values[ix]
+                return
+
+            layers, subkey, squeeze = split
+            if squeeze:
+                self._flat[layers[0]][subkey] = value
+                return
+            shape = np.broadcast_to(0., self._shape[1:])[subkey].shape
+            value = np.broadcast_to(value, (len(layers),) + shape)
+            for ix, lay in enumerate(layers):
+                self._flat[lay][subkey] = value[ix]
+            return
+
+        if self._how in (How.constant, How.sparse):
+            uniform = _uniform_value(value)
+            if uniform is not None:
+                if self._how == How.constant and uniform == self._flat:
+                    return
+                if _covers(key, self._shape):
+                    self._how = How.constant
+                    self._flat = self._dtype.type(uniform)
+                    return
+
+            size = int(np.prod(self._shape))
+            selected = np.broadcast_to(0., self._shape)[key].size
+            sparse = self._flat
+            if self._how == How.constant:
+                sparse = SparseValues(self._flat, size, dtype=self._dtype)
+            index = None
+            if selected <= SPARSE_THRESHOLD * size:
+                index = sparse.flat_index(self._shape, key)
+            if index is None:
+                # advanced index, or too many cells for sparse exceptions:
+                # expand and assign below
+                self._promote()
+            else:
+                sparse.set(index, value)
+                if sparse.nnz == 0:
+                    self._how = How.constant
+                    self._flat = sparse.base
+                    return
+                self._how = How.sparse
+                self._flat = sparse
+                if sparse.nnz > SPARSE_THRESHOLD * sparse.size:
+                    self._promote()
+                return
+
+        raw = self._flat.reshape(self._shape)
+        raw[key] = value
+        if not np.may_share_memory(raw, self._flat):
+            # non-contiguous storage, e.g. a multi-record binary file
+            self._flat = raw.ravel()
+
+    def _promote(self):
+        """
+        Promote a CONSTANT or sparse array to INTERNAL storage. Layers of a
+        layered array are filled into their row of the shared buffer.
+        """
+        if self._how == How.sparse:
+            array = self._flat.toarray(out=self._row)
+        elif self._row is not None:
+            self._row[:] = self._flat
+            array = self._row
+        else:
+            array = np.full(
+                int(np.prod(self._shape)), self._flat, dtype=self._dtype
+            )
+        self._how = How.internal
+        self._flat = array
+
+    def compress(self, threshold=SPARSE_THRESHOLD):
+        """
+        Store an INTERNAL array as sparse exceptions to its most common
+        value when few cells differ from that value. OPEN/CLOSE arrays are
+        left unchanged.
+
+        Parameters
+        ----------
+        threshold : float
+            maximum fraction of cells that may differ from the most common
+            value
 
         Returns
         -------
+            bool : True if the array, or any layer, was compressed
+        """
+        if self._is_layered:
+            compressed = [mfa.compress(threshold) for mfa in self._flat]
+            return any(compressed)
+
+        if self._how != How.internal:
+            return False
+        sparse = SparseValues.from_dense(self._flat)
+        if sparse.nnz > threshold * sparse.size:
+            return False
+        if sparse.nnz == 0:
+            self._how = How.constant
+            self._flat = sparse.base
+        else:
+            self._how = How.sparse
+            self._flat = sparse
+        return True
+
+    def _chunks(self, chunksize=CHUNKSIZE):
+        """
+        Iterate over the array values, with the factor applied, in flat
+        chunks of at most chunksize values. Lazily loaded OPEN/CLOSE text
+        files that are larger than a chunk are streamed from file instead
+        of being loaded.
 
+        Parameters
+        ----------
+        chunksize : int
+            maximum number of values per chunk
+
+        Yields
+        ------
+            np.ndarray
         """
-        values = self.raw_values
-        values[key] = value
         if self._is_layered:
-            for ix, mfa in enumerate(self._flat):
-                mfa[:] = values[ix]
+            for mfa in self._flat:
+                yield from mfa._chunks(chunksize)
             return
 
-        values = values.ravel()
+        factor = self.factor
+        size = int(np.prod(self._shape))
         if self._how == How.constant:
-            if not np.allclose(values, values[0]):
-                self._how = How.internal
-                self._flat = values
-            else:
-                self._flat = values[0]
-        else:
-            self._flat = values
+            value = self._flat * factor
+            for start in range(0, size, chunksize):
+                yield np.full(
+                    min(chunksize, size - start), value, dtype=self._dtype
+                )
+            return
+
+        if self._how == How.sparse:
+            flat = self._flat.flat
+            for start in range(0, size, chunksize):
+                yield flat[start:start + chunksize] * factor
+            return
+
+        if self._array is None and self._path is not None and \
+                size > chunksize:
+            with open(self._path) as foo:
+                for chunk in iter_array_block(foo, dtype=self._dtype):
+                    yield chunk if factor == 1 else chunk * factor
+            return
+
+        for _, chunk in _flat_chunks(self._flat, chunksize):
+            yield chunk if factor == 1 else chunk * factor
+
+    def _apply_ufunc(self, ufunc, others, chunksize=CHUNKSIZE):
+        """
+        Apply an elementwise ufunc to the raw values in place, one chunk at
+        a time, so no full size temporary array is created
+
+        Parameters
+        ----------
+        ufunc : np.ufunc
+        others : list
+            other operands, scalars or C contiguous arrays with the shape
+            of this array
+        chunksize : int
+            maximum number of values per chunk
+        """
+        if self._is_layered:
+            for ix, mfa in enumerate(self._flat):
+                lay_others = [
+                    other if np.ndim(other) == 0 else other[ix]
+                    for other in others
+                ]
+                mfa._apply_ufunc(ufunc, lay_others, chunksize)
+            return
+
+        scalars = all(np.ndim(other) == 0 for other in others)
+        if self._how == How.constant and scalars:
+            constant = np.array(self._flat)
+            ufunc(constant, *others, out=constant, casting="same_kind")
+            self._flat = constant[()]
+            return
+        if self._how == How.sparse and scalars:
+            self._flat.apply(ufunc, *others, casting="same_kind")
+            return
+        if self._how in (How.constant, How.sparse):
+            self._promote()
+
+        for offset, chunk in _flat_chunks(self._flat, chunksize):
+            args = [
+                other if np.ndim(other) == 0 else
+                other.reshape(-1)[offset:offset + chunk.size]
+                for other in others
+            ]
+            ufunc(chunk, *args, out=chunk, casting="same_kind")
 
     def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        others = [
+            other.values if isinstance(other, MFArray) else other
+            for other in inputs[1:]
+        ]
+        if method == "__call__" and not kwargs and inputs[0] is self and \
+                ufunc.nout == 1 and all(
+                    np.ndim(other) == 0 or np.shape(other) == self._shape
+                    for other in others
+                ):
+            # elementwise, written back to the storage chunk by chunk
+            others = [
+                other if np.ndim(other) == 0 else np.ascontiguousarray(other)
+                for other in others
+            ]
+            self._apply_ufunc(ufunc, others)
+            return self
+
         raw = self.raw_values
         if len(inputs) == 1:
             result = raw.__array_ufunc__(ufunc, method, raw, **kwargs)
@@ -154,13 +554,295 @@ class MFArray(DataInterface, MFArrayMixins):
     def _check_if_compatible(self):
         return
 
+    def to_shared(self):
+        """
+        Move the values into a shared memory block that worker processes
+        can attach to without copying. The array keeps working as before,
+        with the block as its storage; CONSTANT and sparse storage is
+        expanded to INTERNAL.
+
+        Returns
+        -------
+            SharedArrayHandle : picklable handle, call attach() on it in a
+            worker to get an MFArray view of the block, and unlink() on it
+            when the block is no longer needed
+        """
+        from .shared import SharedArrayHandle
+
+        return SharedArrayHandle.create(self)
+
+    def to_xarray(self, name=None, dims=None):
+        """
+        Export the array values, with the factor applied, as an xarray
+        DataArray backed by a dask array. Every layer is a separate dask
+        chunk: CONSTANT layers are broadcast lazily, memory mapped and
+        loaded layers are wrapped without a copy, and unloaded OPEN/CLOSE
+        layers are only read when their chunk is computed.
+
+        Requires xarray and dask.
+
+        Parameters
+        ----------
+        name : str, optional
+            name of the DataArray
+        dims : tuple of str, optional
+            dimension names. By default ("layer", "row", "col") for three
+            dimensional arrays
+
+        Returns
+        -------
+            xarray.DataArray
+        """
+        import dask.array as da
+        import xarray as xr
+
+        if dims is None:
+            dims = _default_dims(self._shape, self._is_layered)
+        if self._is_layered:
+            data = da.stack([mfa._to_dask() for mfa in self._flat])
+        else:
+            data = self._to_dask()
+        return xr.DataArray(
+            data,
+            dims=dims,
+            name=name,
+            attrs={"control_record": self.control_record},
+        )
+
+    def _to_dask(self):
+        """
+        Dask array of the values of a single, not layered, array. Three
+        dimensional arrays are chunked per layer.
+
+        Returns
+        -------
+            dask.array.Array
+        """
+        import dask
+        import dask.array as da
+
+        factor = self.factor
+        if self._how == How.constant:
+            return da.full(
+                self._shape, self._flat * factor, dtype=self._dtype
+            )
+
+        if self._how == How.sparse:
+            values = dask.delayed(_expand_sparse)(
+                self._flat.copy(), self._shape, factor
+            )
+            return da.from_delayed(values, self._shape, dtype=self._dtype)
+
+        if not self.is_loaded:
+            # read when computed, without storing the values in this array
+            values = dask.delayed(_read_values)(
+                self._path, self._shape, self._cache, self._dtype, factor
+            )
+            return da.from_delayed(values, self._shape, dtype=self._dtype)
+
+        chunks = self._shape
+        if len(self._shape) == 3:
+            chunks = (1,) + tuple(self._shape[1:])
+        # name=False skips hashing the values to name the dask array
+        data = da.from_array(
+            self._flat.reshape(self._shape), chunks=chunks, name=False
+        )
+        if factor != 1:
+            data = data * factor
+        return data
+
+    @classmethod
+    def from_xarray(cls, data, layered=False, dtype=None):
+        """
+        Build an INTERNAL MFArray from an xarray DataArray, or from a dask
+        or numpy array. Dask chunks are computed and stored into the array
+        storage one chunk at a time, so the values are only held in memory
+        once. Arrays or layers with all values equal become CONSTANT.
+
+        Parameters
+        ----------
+        data : xarray.DataArray, dask.array.Array, or np.ndarray
+        layered : bool
+            store the first dimension as separate layers
+        dtype : np.dtype, optional
+            data type of the array, by default the type of data
+
+        Returns
+        -------
+            MFArray
+        """
+        values = data
+        if hasattr(data, "dims"):
+            # xarray DataArray, use the underlying dask or numpy array
+            values = data.data
+        shape = tuple(values.shape)
+        dtype = np.dtype(values.dtype if dtype is None else dtype)
+
+        if layered:
+            objs = [
+                MFArray(dtype.type(0), shape[1:], How.constant, dtype=dtype)
+                for _ in range(shape[0])
+            ]
+            mfa = MFArray(
+                np.array(objs, dtype=object),
+                shape,
+                how=None,
+                layered=True,
+                dtype=dtype,
+            )
+            layers = objs
+            for layer in layers:
+                layer._how = How.internal
+                layer._flat = layer._row
+            target = mfa._buffer.reshape(shape)
+        else:
+            target = np.empty(shape, dtype=dtype)
+            mfa = MFArray(target.reshape(-1), shape, How.internal, dtype=dtype)
+            layers = [mfa]
+
+        if isinstance(values, np.ndarray):
+            target[...] = values
+        else:
+            import dask.array as da
+            da.store(values, target, lock=False)
+
+        for layer in layers:
+            if all_equal(layer._flat):
+                layer._how = How.constant
+                layer._flat = layer._flat[0]
+        return mfa
+
+    @profiling.profiled("MFArray.write")
+    def write(self, f, cwd=None, values_per_line=10, fmt=None):
+        """
+        Write the control record(s) and data to an open file handle
+
+        INTERNAL arrays with all values equal are written as CONSTANT.
+        OPEN/CLOSE data is written to the external file, relative to cwd.
+        External files that were never loaded are copied instead of being
+        parsed and written.
+
+        Parameters
+        ----------
+        f : file object
+            open text file handle
+        cwd : Path, optional
+            directory that OPEN/CLOSE paths are relative to. By default the
+            external file is written to the path it was loaded from
+        values_per_line : int
+            number of values written on each line
+        fmt : str, optional
+            printf style format of a single value. By default integers are
+            written as "%d" and floats as "%.8e"
+        """
+        if fmt is None:
+            fmt = _default_fmt(self._dtype)
+
+        if self._is_layered:
+            for mfa in self._flat:
+                mfa.write(f, cwd, values_per_line=values_per_line, fmt=fmt)
+            return
+
+        if self._how == How.external:
+            f.write(f"{self.control_record}\n")
+            self._write_external(cwd, values_per_line, fmt)
+            return
+
+        if self._how == How.sparse and self._flat.nnz:
+            f.write(f"{self.control_record}\n")
+            # sparse storage is expanded one chunk at a time
+            array_to_f(
+                f, self._flat, values_per_line=values_per_line, fmt=fmt
+            )
+            return
+
+        if self._how == How.sparse:
+            value = self._flat.base
+            f.write(f"{CommonNames.constant} {fmt % (value * self.factor)}\n")
+            return
+
+        if self._how == How.constant or all_equal(self._flat):
+            value = self._flat
+            if self._how != How.constant:
+                value = self._flat.flat[0]
+            f.write(f"{CommonNames.constant} {fmt % (value * self.factor)}\n")
+            return
+
+        f.write(f"{self.control_record}\n")
+        array_to_f(f, self._flat, values_per_line=values_per_line, fmt=fmt)
+
+    def _write_external(self, cwd, values_per_line, fmt):
+        """
+        Write or copy the OPEN/CLOSE file of the array
+        """
+        if cwd is None:
+            fpath = Path(self._path)
+        else:
+            fpath = Path(cwd) / self._fname
+        same_file = fpath.exists() and os.path.samefile(fpath, self._path)
+
+        if not self.is_loaded:
+            if not same_file:
+                shutil.copyfile(self._path, fpath)
+            return
+
+        # the source may be memory mapped, never truncate it in place
+        tmp = fpath
+        if same_file:
+            tmp = fpath.with_name(f"{fpath.name}.tmp")
+
+        if self._binary:
+            BinaryArray().write_binary_array(
+                tmp, self.raw_values, precision=_precision(self._dtype)
+            )
+        else:
+            with open(tmp, "w") as foo:
+                array_to_f(
+                    foo, self._flat, values_per_line=values_per_line, fmt=fmt
+                )
+
+        if same_file:
+            os.replace(tmp, fpath)
+
     @classmethod
-    def load(cls, f, cwd, shape, layered=False):
+    @profiling.profiled("MFArray.load")
+    def load(
+        cls,
+        f,
+        cwd,
+        shape,
+        layered=False,
+        lazy=False,
+        workers=None,
+        processes=False,
+        cache=None,
+        dtype=None,
+    ):
         """
 
         Parameters
         ----------
         f
+        cwd
+        shape
+        layered
+        lazy : bool
+            defer parsing OPEN/CLOSE files until the array values are
+            first accessed
+        workers : int, optional
+            number of workers used to parse the OPEN/CLOSE files of a
+            layered array concurrently. By default layers are loaded one
+            after another
+        processes : bool
+            use a process pool instead of a thread pool. Processes avoid
+            the GIL for parse-bound files, threads avoid copying the parsed
+            values back for I/O-bound files
+        cache : ParseCache, optional
+            on-disk cache of parsed OPEN/CLOSE files. Unchanged files are
+            loaded from the cache instead of being parsed
+        dtype : np.dtype, optional
+            data type the values are parsed into, for example np.int32 for
+            IDOMAIN. Defaults to np.float64
 
         Returns
         -------
@@ -169,26 +851,102 @@ class MFArray(DataInterface, MFArrayMixins):
         if layered:
             nlay = shape[0]
             lay_shape = shape[1:]
+            parallel = workers is not None and workers > 1 and not lazy
             objs = []
             for lay in range(nlay):
-                mfa = cls._loader(f, cwd, lay_shape)
+                # scan the control records first when loading in parallel
+                mfa = cls._loader(
+                    f,
+                    cwd,
+                    lay_shape,
+                    lazy=lazy or parallel,
+                    cache=cache,
+                    dtype=dtype,
+                )
                 objs.append(mfa)
 
+            if parallel:
+                cls._load_parallel(objs, workers, processes)
+
             mfa = MFArray(
                 np.array(objs, dtype=object),
                 shape,
                 how=None,
                 factor=None,
-                layered=True
+                layered=True,
+                dtype=dtype,
             )
 
         else:
-            mfa = cls._loader(f, cwd, shape, layered=layered)
+            mfa = cls._loader(
+                f,
+                cwd,
+                shape,
+                layered=layered,
+                lazy=lazy,
+                cache=cache,
+                dtype=dtype,
+            )
 
         return mfa
 
+    @staticmethod
+    def _load_parallel(objs, workers, processes=False):
+        """
+        Parse the OPEN/CLOSE files of unloaded layers concurrently. Layers
+        are filled in order, and the exception of the first layer that
+        fails is raised.
+
+        Parameters
+        ----------
+        objs : list of MFArray
+            layer arrays
+        workers : int
+            number of workers
+        processes : bool
+            use a process pool instead of a thread pool
+        """
+        pending = [
+            (lay, mfa) for lay, mfa in enumerate(objs) if not mfa.is_loaded
+        ]
+        if not pending:
+            return
+
+        pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        with pool(max_workers=min(workers, len(pending))) as executor:
+            futures = [
+                executor.submit(
+                    _load_external,
+                    mfa._path,
+                    int(np.prod(mfa._shape)),
+                    mfa._cache,
+                    mfa._dtype,
+                )
+                for _, mfa in pending
+            ]
+            for (lay, mfa), future in zip(pending, futures):
+                try:
+                    mfa._array = future.result()
+                except Exception as e:
+                    for other in futures:
+                        other.cancel()
+                    if hasattr(e, "add_note"):
+                        e.add_note(f"while loading layer {lay + 1} from "
+                                   f"{mfa._path}")
+                    raise
+
     @classmethod
-    def _loader(cls, f, cwd, shape, layered=False):
+    @profiling.profiled("MFArray._loader")
+    def _loader(
+        cls,
+        f,
+        cwd,
+        shape,
+        layered=False,
+        lazy=False,
+        cache=None,
+        dtype=None,
+    ):
         """
 
         Parameters
@@ -197,12 +955,19 @@ class MFArray(DataInterface, MFArrayMixins):
         cwd
         shape
         layered
+        lazy
+        cache
+        dtype
 
         Returns
         -------
 
         """
+        dtype = np.dtype(np.float64 if dtype is None else dtype)
         control_line = multi_line_strip(f).split()
+        fpath = None
+        ext_path = None
+        binary = False
 
         if CommonNames.iprn.lower() in control_line:
             idx = control_line.index(CommonNames.iprn.lower())
@@ -213,51 +978,303 @@ class MFArray(DataInterface, MFArrayMixins):
         clpos = 1
 
         if how == How.internal:
-            array = f_to_array(f)
+            array = f_to_array(f, count=int(np.prod(shape)), dtype=dtype)
 
         elif how == How.constant:
-            array = float(control_line[clpos])
+            array = _to_scalar(control_line[clpos], dtype)
             clpos += 1
 
         elif how == how.external:
             ext_path = Path(control_line[clpos])
             fpath = cwd / ext_path
-            with open(fpath) as foo:
-                array = f_to_array(foo)
+            profiling.annotate(fpath)
+            binary = CommonNames.binary.lower() in control_line
+            array = None
+            if binary:
+                # memory mapped, values are paged in on access
+                array, _ = BinaryArray().memmap_binary_data_from_file(
+                    fpath,
+                    shape,
+                    data_type=dtype,
+                    precision=_precision(dtype),
+                )
+                if array.flags.c_contiguous:
+                    array = array.ravel()
+            elif not lazy:
+                array = _load_external(
+                    fpath, int(np.prod(shape)), cache, dtype
+                )
             clpos += 1
 
         else:
             raise NotImplementedError()
 
         factor = None
-        if len(control_line) > 2:
-            factor = float(control_line[clpos + 1])
+        if CommonNames.factor.lower() in control_line:
+            idx = control_line.index(CommonNames.factor.lower())
+            factor = _to_scalar(control_line[idx + 1], dtype)
 
-        mfa = MFArray(array, shape, how, factor=factor)
+        mfa = MFArray(
+            array,
+            shape,
+            how,
+            factor=factor,
+            path=fpath,
+            binary=binary,
+            fname=ext_path,
+            dtype=dtype,
+        )
+        mfa._cache = cache
         return mfa
 
 
-def f_to_array(f):
-    astr = []
-    while True:
-        pos = f.tell()
-        line = f.readline()
-        line = line_strip(line)
-        if line in (
-                CommonNames.empty,
-                CommonNames.internal,
-                CommonNames.external,
-                CommonNames.constant
-        ):
-            f.seek(pos, 0)
-            break
-        elif CommonNames.internal in line or CommonNames.external in line \
-                or CommonNames.constant in line:
-            f.seek(pos, 0)
-            break
-        astr.append(line)
-
-    astr = StringIO(" ".join(astr))
-    array = np.genfromtxt(astr).ravel()
+def _split_layer_key(key, nlay):
+    """
+    Split a basic index of a layered array into the selected layers and
+    the index within each layer
+
+    Parameters
+    ----------
+    key
+        index of the layered array
+    nlay : int
+        number of layers
+
+    Returns
+    -------
+        tuple of (list of layer numbers, layer index, bool that is True
+        when the layer dimension is indexed by an integer), or None for
+        advanced indices
+    """
+    if not isinstance(key, tuple):
+        key = (key,)
+    for item in key:
+        if not (item is Ellipsis or isinstance(item, (int, np.integer,
+                                                      slice))):
+            return None
+
+    if key and key[0] is Ellipsis:
+        return list(range(nlay)), key, False
+    if not key:
+        return list(range(nlay)), (), False
+
+    lay = key[0]
+    if isinstance(lay, slice):
+        return list(range(nlay)[lay]), key[1:], False
+    if not -nlay <= lay < nlay:
+        raise IndexError(
+            f"index {lay} is out of bounds for axis 0 with size {nlay}"
+        )
+    return [int(lay) % nlay], key[1:], True
+
+
+def _covers(key, shape):
+    """
+    Check if a basic index selects every cell of an array
+
+    Parameters
+    ----------
+    key
+        index
+    shape : tuple
+        array shape
+
+    Returns
+    -------
+        bool
+    """
+    if not isinstance(key, tuple):
+        key = (key,)
+    key = [item for item in key if item is not Ellipsis]
+    if len(key) > len(shape):
+        return False
+    for item, n in zip(key, shape):
+        if not isinstance(item, slice):
+            return False
+        start, stop, step = item.indices(n)
+        if abs(step) != 1 or len(range(start, stop, step)) != n:
+            return False
+    return True
+
+
+def _uniform_value(value):
+    """
+    Single value of a scalar or an array with all values equal
+
+    Returns
+    -------
+        scalar or None when the values differ
+    """
+    if np.ndim(value) == 0:
+        return value
+    value = np.asarray(value)
+    if value.size and all_equal(value):
+        return value.flat[0]
+    return None
+
+
+@profiling.profiled("f_to_array")
+def f_to_array(f, count=None, dtype=np.float64):
+    """
+    Read a free format array block from an open file handle
+
+    Parameters
+    ----------
+    f : file object
+        open file handle positioned at the first line of array data
+    count : int, optional
+        number of values expected in the block
+    dtype : np.dtype
+        data type the values are parsed into
+
+    Returns
+    -------
+        np.ndarray : flat array of values
+    """
+    return read_array_block(f, count=count, dtype=dtype)
+
+
+@profiling.profiled("_load_external")
+def _load_external(fpath, count=None, cache=None, dtype=np.float64):
+    """
+    Parse an OPEN/CLOSE text file
+
+    Parameters
+    ----------
+    fpath : Path
+        external file path
+    count : int, optional
+        number of values expected in the file
+    cache : ParseCache, optional
+        cache of parsed files that is checked before the file is parsed
+    dtype : np.dtype
+        data type the values are parsed into
+
+    Returns
+    -------
+        np.ndarray
+    """
+    profiling.annotate(fpath)
+    if cache is not None:
+        array = cache.get(fpath)
+        if array is not None and array.dtype == dtype and \
+                (count is None or array.size == count):
+            return array
+
+    with open(fpath) as foo:
+        array = f_to_array(foo, count=count, dtype=dtype)
+    if cache is not None:
+        cache.put(fpath, array)
     return array
 
+
+def _default_dims(shape, layered=False):
+    """
+    Default dimension names of an array shape
+    """
+    if len(shape) == 3:
+        return "layer", "row", "col"
+    if len(shape) == 2:
+        return ("layer", "node") if layered else ("row", "col")
+    if len(shape) == 1:
+        return ("node",)
+    return tuple(f"dim_{ix}" for ix in range(len(shape)))
+
+
+def _read_values(fpath, shape, cache, dtype, factor):
+    """
+    Read the values of an OPEN/CLOSE text file with the factor applied
+    """
+    array = _load_external(fpath, int(np.prod(shape)), cache, dtype)
+    array = array.reshape(shape)
+    return array if factor == 1 else array * factor
+
+
+def _expand_sparse(sparse, shape, factor):
+    """
+    Expand sparse storage to values with the factor applied
+    """
+    array = sparse.toarray().reshape(shape)
+    return array if factor == 1 else array * factor
+
+
+def _flat_chunks(array, chunksize, offset=0):
+    """
+    Iterate over writable flat views of an array in C order. Arrays that
+    are not contiguous, like multi-record binary files, are split along
+    their first axis.
+
+    Parameters
+    ----------
+    array : np.ndarray
+    chunksize : int
+        maximum number of values per chunk
+    offset : int
+        flat offset of the array
+
+    Yields
+    ------
+        tuple of (int, np.ndarray) : flat offset and chunk
+    """
+    if array.flags.c_contiguous or array.ndim == 1:
+        flat = array.reshape(-1)
+        for start in range(0, flat.size, chunksize):
+            yield offset + start, flat[start:start + chunksize]
+        return
+
+    step = int(np.prod(array.shape[1:]))
+    for ix, sub in enumerate(array):
+        yield from _flat_chunks(sub, chunksize, offset + ix * step)
+
+
+def _to_scalar(token, dtype):
+    """
+    Convert a control record value, like a CONSTANT or FACTOR, to dtype
+
+    Parameters
+    ----------
+    token : str
+    dtype : np.dtype
+
+    Returns
+    -------
+        np.generic
+    """
+    if np.issubdtype(dtype, np.integer):
+        return dtype.type(int(token))
+    return dtype.type(float(token.lower().replace("d", "e")))
+
+
+def _default_fmt(dtype):
+    """
+    Default printf style format of a value of dtype
+    """
+    if np.issubdtype(dtype, np.integer):
+        return "%d"
+    return "%.8e"
+
+
+def _precision(dtype):
+    """
+    Precision of binary file headers for arrays of dtype
+    """
+    if dtype == np.float32:
+        return "single"
+    return "double"
+
+
+def array_to_f(f, array, values_per_line=10, fmt="%.8e"):
+    """
+    Write array values to an open file handle as a free format block
+
+    Parameters
+    ----------
+    f : file object
+        open text file handle
+    array : np.ndarray
+    values_per_line : int
+        number of values written on each line
+    fmt : str
+        printf style format of a single value
+    """
+    write_array_block(f, array, values_per_line=values_per_line, fmt=fmt)
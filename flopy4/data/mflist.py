@@ -1,14 +1,531 @@
+import bisect
+import hashlib
+import itertools
+import re
 import numpy as np
-import pandas as pd
 from pathlib import Path
-from .constants import How
-from flopy.datbase import DataType, DataListInterface
+from .binary import BinaryList, cellid_dtype
+from .constants import CommonNames
+from .datbase import DataListInterface
+from .readers import iter_block_text, line_strip, _COMMENT
+
+
+_END_BLOCK = re.compile(r"^[ \t]*END\b", re.M | re.I)
+_TRANSLATE = str.maketrans({",": " ", "D": "E", "d": "e"})
+_RECORD_LINE = re.compile(r"^[ \t]*\S", re.M)
 
 
 class MFList(DataListInterface):
-    def __init__(self):
-        self.x = None
+    """
+    Stress period list data stored as one NumPy structured array per
+    stress period. The cellid is stored as 0-based integer columns (layer,
+    row, col for structured grids), followed by the package fields, the
+    auxiliary variables, and optionally the boundname.
+
+    As in MODFLOW 6, a stress period without data carries forward the
+    data of the previous period. Periods with identical data share a
+    single read-only buffer; use edit() to get a writable copy of one
+    period.
+
+    Parameters
+    ----------
+    data : dict, optional
+        dictionary of zero-based stress period numbers and records. Records
+        can be structured arrays, pandas DataFrames, or lists of tuples
+    fields : list of (str, np.dtype)
+        names and data types of the package fields that follow the cellid
+    aux : list of str, optional
+        names of the auxiliary variables
+    boundnames : bool
+        flag indicating that each record ends with a boundname
+    grid_type : str
+        "structured", "vertex", or "unstructured"
+    """
+    def __init__(
+        self,
+        data=None,
+        fields=None,
+        aux=None,
+        boundnames=False,
+        grid_type=CommonNames.structured,
+    ):
+        if fields is None:
+            fields = []
+        if aux is None:
+            aux = []
+        self._fields = list(fields)
+        self._aux = list(aux)
+        self._boundnames = boundnames
+        self._grid_type = grid_type
+        self._dtype = self._build_dtype()
+        self._data = {}
+        self._pool = {}
+        if data is not None:
+            for kper, records in data.items():
+                self[kper] = records
+
+    def _build_dtype(self):
+        dtype = cellid_dtype(self._grid_type)
+        dtype += self._fields
+        dtype += [(name, np.float64) for name in self._aux]
+        if self._boundnames:
+            dtype.append((CommonNames.boundname, "U40"))
+        return np.dtype(dtype)
+
+    @property
+    def dtype(self):
+        """
+        Returns
+        -------
+            np.dtype : record data type
+        """
+        return self._dtype
+
+    @property
+    def cellid_names(self):
+        """
+        Returns
+        -------
+            list : names of the cellid columns
+        """
+        return [name for name, _ in cellid_dtype(self._grid_type)]
+
+    @property
+    def periods(self):
+        """
+        Returns
+        -------
+            list : sorted zero-based stress periods that are defined
+            explicitly. Other periods carry forward the previous period
+        """
+        return sorted(self._data)
+
+    def _lookup(self, kper):
+        """
+        Get the data of a stress period, carrying forward the data of the
+        last defined period
+        """
+        if kper in self._data:
+            return self._data[kper]
+        periods = self.periods
+        ix = bisect.bisect_right(periods, kper)
+        if ix == 0:
+            raise KeyError(f"No list data defined for stress period {kper}")
+        return self._data[periods[ix - 1]]
+
+    def _store(self, kper, array):
+        """
+        Store the data of a stress period. Data that is identical to the
+        data of another period shares that period's buffer.
+        """
+        array = np.ascontiguousarray(array)
+        digest = hashlib.blake2b(array.data, digest_size=16).digest()
+        key = (array.dtype, array.size, digest)
+        shared = self._pool.get(key)
+        if shared is not None:
+            array = shared
+        else:
+            array.flags.writeable = False
+            self._pool[key] = array
+        self._release(kper)
+        self._data[kper] = array
+
+    def _release(self, kper):
+        """
+        Drop the buffer of a stress period from the pool if no other period
+        references it
+        """
+        array = self._data.pop(kper, None)
+        if array is None:
+            return
+        if any(other is array for other in self._data.values()):
+            return
+        for key, pooled in list(self._pool.items()):
+            if pooled is array:
+                del self._pool[key]
+
+    def is_shared(self, kper):
+        """
+        Check if the data of a stress period shares its buffer with another
+        stress period, either because the data is identical or because the
+        period is not defined and carries forward an earlier period
+
+        Parameters
+        ----------
+        kper : int
+            zero-based stress period
+
+        Returns
+        -------
+            bool
+        """
+        if kper not in self._data:
+            return True
+        array = self._data[kper]
+        return sum(other is array for other in self._data.values()) > 1
+
+    def edit(self, kper):
+        """
+        Get a writable array of the data of a stress period. The data is
+        copied only if the buffer is shared with other stress periods.
+
+        Parameters
+        ----------
+        kper : int
+            zero-based stress period
+
+        Returns
+        -------
+            np.recarray
+        """
+        array = self._lookup(kper)
+        if self.is_shared(kper):
+            array = array.copy()
+        else:
+            self._release(kper)
+            array.flags.writeable = True
+        self._data[kper] = array
+        return array.view(np.recarray)
+
+    def get_empty(self, nrow=0):
+        """
+        Get an empty record array with the list data type
+
+        Parameters
+        ----------
+        nrow : int
+            number of records
+
+        Returns
+        -------
+            np.recarray
+        """
+        return np.zeros(nrow, dtype=self._dtype).view(np.recarray)
+
+    def __getitem__(self, kper):
+        """
+        Parameters
+        ----------
+        kper : int
+            zero-based stress period
+
+        Returns
+        -------
+            np.recarray : view of the stress period records. The view is
+            read-only if the buffer is shared, see edit()
+        """
+        return self._lookup(kper).view(np.recarray)
+
+    def __setitem__(self, kper, records):
+        """
+        Parameters
+        ----------
+        kper : int
+            zero-based stress period
+        records : np.ndarray, pd.DataFrame, or list of tuples
+        """
+        self._store(kper, self._to_array(records))
+
+    def __str__(self):
+        s = []
+        for kper in self.periods:
+            s.append(f"period {kper + 1}:\n{self._data[kper]}")
+        return "\n".join(s)
+
+    def _to_array(self, records):
+        if hasattr(records, "to_records"):
+            records = records.to_records(index=False)
+        if isinstance(records, np.ndarray) and records.dtype.names:
+            if records.dtype == self._dtype:
+                return records.view(np.ndarray).copy()
+            array = np.zeros(len(records), dtype=self._dtype)
+            for name in self._dtype.names:
+                if name in records.dtype.names:
+                    array[name] = records[name]
+            return array
+        return np.array([tuple(rec) for rec in records], dtype=self._dtype)
+
+    def to_records(self, kper):
+        """
+        Parameters
+        ----------
+        kper : int
+            zero-based stress period
+
+        Returns
+        -------
+            np.recarray
+        """
+        return self[kper]
+
+    def to_dict(self):
+        """
+        Returns
+        -------
+            dict : zero-based stress periods and record arrays
+        """
+        return {kper: self[kper] for kper in self.periods}
+
+    def to_dataframe(self, kper):
+        """
+        Parameters
+        ----------
+        kper : int
+            zero-based stress period
+
+        Returns
+        -------
+            pd.DataFrame
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self._lookup(kper))
+
+    def filter_cellid(self, kper, cellids):
+        """
+        Get the records of a stress period that are in a set of cells
+
+        Parameters
+        ----------
+        kper : int
+            zero-based stress period
+        cellids : array_like
+            zero-based cellids, shape (ncells, ncellid components)
+
+        Returns
+        -------
+            np.recarray
+        """
+        data = self._lookup(kper)
+        names = self.cellid_names
+        cellids = np.asarray(cellids, dtype=np.int64).reshape(-1, len(names))
+        if data.size == 0 or cellids.size == 0:
+            return data[:0].view(np.recarray)
+
+        cols = np.column_stack([data[name] for name in names])
+        dims = np.maximum(cols.max(axis=0), cellids.max(axis=0)) + 1
+        keys = np.ravel_multi_index(cols.T, dims)
+        query = np.ravel_multi_index(cellids.T, dims)
+        return data[np.isin(keys, query)].view(np.recarray)
 
     @classmethod
-    def load(cls):
-        pass
\ No newline at end of file
+    def load(
+        cls,
+        f,
+        cwd,
+        fields,
+        aux=None,
+        boundnames=False,
+        grid_type=CommonNames.structured,
+    ):
+        """
+        Load the PERIOD blocks of a package file
+
+        Lines outside of PERIOD blocks are skipped. The records of each
+        block are parsed in bulk into typed columns.
+
+        Parameters
+        ----------
+        f : file object
+            open package file handle
+        cwd : Path
+            directory that OPEN/CLOSE paths are relative to
+        fields : list of (str, np.dtype)
+        aux : list of str, optional
+        boundnames : bool
+        grid_type : str
+
+        Returns
+        -------
+            MFList
+        """
+        mfl = cls(
+            fields=fields, aux=aux, boundnames=boundnames, grid_type=grid_type
+        )
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            tokens = line_strip(line).lower().split()
+            if len(tokens) > 2 and tokens[0] == "begin" and \
+                    tokens[1] == "period":
+                kper = int(tokens[2]) - 1
+                mfl._store(kper, mfl._load_period(f, cwd))
+        return mfl
+
+    def write(self, f, float_fmt="%.8e", chunksize=10000):
+        """
+        Write the PERIOD blocks to an open file handle. A stress period
+        whose data shares its buffer with the previous written period is
+        not written, MODFLOW 6 carries the previous period forward.
+
+        Parameters
+        ----------
+        f : file object
+            open text file handle
+        float_fmt : str
+            printf style format for floating point columns
+        chunksize : int
+            number of records formatted at once
+        """
+        previous = None
+        for kper in self.periods:
+            array = self._data[kper]
+            if array is previous:
+                continue
+            f.write(f"BEGIN PERIOD {kper + 1}\n")
+            self._write_records(f, array, float_fmt, chunksize)
+            f.write("END PERIOD\n\n")
+            previous = array
+
+    def _write_records(self, f, array, float_fmt, chunksize):
+        names = self._dtype.names
+        fmt = []
+        for name in names:
+            kind = self._dtype[name].kind
+            if kind in "iu":
+                fmt.append("%d")
+            elif kind == "f":
+                fmt.append(float_fmt)
+            else:
+                fmt.append("%s")
+        line = "  " + " ".join(fmt) + "\n"
+        cellid_names = self.cellid_names
+        for start in range(0, len(array), chunksize):
+            chunk = array[start:start + chunksize]
+            cols = []
+            for name in names:
+                col = chunk[name]
+                if name in cellid_names:
+                    col = col + 1
+                cols.append(col.tolist())
+            values = tuple(itertools.chain.from_iterable(zip(*cols)))
+            f.write((line * len(chunk)) % values)
+
+    def _load_period(self, f, cwd):
+        """
+        Load the records of a PERIOD block. On return the file handle is
+        positioned after the END PERIOD line.
+        """
+        # the block can be a single OPEN/CLOSE record
+        pos = f.tell()
+        control_line = []
+        while not control_line:
+            line = f.readline()
+            if not line:
+                break
+            control_line = line_strip(line).split()
+        if control_line and control_line[0].upper() == CommonNames.external:
+            fpath = Path(cwd) / control_line[1]
+            if CommonNames.binary in [s.upper() for s in control_line]:
+                data = BinaryList(self._fields + [
+                    (name, np.float64) for name in self._aux
+                ]).read_binary_data_from_file(
+                    fpath, _GridType(self._grid_type)
+                )
+                data = self._to_array(data)
+            else:
+                with open(fpath) as foo:
+                    data = self._parse_records(
+                        iter_block_text(foo, _END_BLOCK)
+                    )
+            for _ in iter_block_text(f, _END_BLOCK):
+                pass
+            f.readline()
+            return data
+
+        f.seek(pos)
+        data = self._parse_records(iter_block_text(f, _END_BLOCK))
+        f.readline()
+        return data
+
+    def _parse_records(self, blocks):
+        """
+        Parse chunks of record lines into a structured array
+        """
+        parts = [self._parse_text(text) for text in blocks]
+        if not parts:
+            return np.empty(0, dtype=self._dtype)
+        elif len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    def _parse_text(self, text):
+        if "#" in text or ";" in text or "!" in text:
+            text = _COMMENT.sub("", text)
+        names = self._dtype.names
+        ncol = len(names)
+        strings = [
+            ix for ix, name in enumerate(names)
+            if self._dtype[name].kind in "OSU"
+        ]
+        if strings:
+            # string columns, like boundnames or time series names, are
+            # taken from the token matrix and only the other columns are
+            # converted to numbers
+            tokens = np.array(text.replace(",", " ").split())
+            # every record needs all of its columns to be parsed as one
+            # block, otherwise a record without its optional boundname
+            # would shift the columns
+            if tokens.size != ncol * len(_RECORD_LINE.findall(text)):
+                return self._parse_lines(text)
+            tokens = tokens.reshape(-1, ncol)
+            numbers = [ix for ix in range(ncol) if ix not in strings]
+            values = np.fromstring(
+                " ".join(tokens[:, numbers].ravel()).translate(_TRANSLATE),
+                sep=" ",
+            ).reshape(-1, len(numbers))
+            array = np.empty(len(tokens), dtype=self._dtype)
+            for col, ix in enumerate(numbers):
+                array[names[ix]] = values[:, col]
+            for ix in strings:
+                array[names[ix]] = tokens[:, ix]
+        else:
+            values = np.fromstring(text.translate(_TRANSLATE), sep=" ")
+            if values.size % ncol != 0:
+                raise ValueError(
+                    f"List data with {values.size} values can not be "
+                    f"split into records of {ncol} columns"
+                )
+            values = values.reshape(-1, ncol)
+            array = np.empty(len(values), dtype=self._dtype)
+            for ix, name in enumerate(names):
+                array[name] = values[:, ix]
+
+        for name in self.cellid_names:
+            array[name] -= 1
+        return array
+
+    def _parse_lines(self, text):
+        """
+        Record by record parsing for blocks where only some records have a
+        boundname
+        """
+        names = self._dtype.names
+        ncol = len(names)
+        numbers = [
+            ix for ix, name in enumerate(names)
+            if self._dtype[name].kind not in "OSU"
+        ]
+        records = []
+        for line in text.splitlines():
+            tokens = line.replace(",", " ").split()
+            if not tokens:
+                continue
+            if len(tokens) < ncol:
+                tokens.append("")
+            for ix in numbers[:len(tokens)]:
+                tokens[ix] = tokens[ix].translate(_TRANSLATE)
+            records.append(tuple(tokens[:ncol]))
+        array = np.array(records, dtype=self._dtype)
+        for name in self.cellid_names:
+            array[name] -= 1
+        return array
+
+
+class _GridType:
+    """
+    Minimal stand-in for a modelgrid when only the grid type is known
+    """
+    def __init__(self, grid_type):
+        self.grid_type = grid_type
@@ -1,4 +1,12 @@
 import numpy as np
+from .constants import How
+
+
+# number of values processed at once by the chunked reductions, arrays
+# larger than this use the streaming median
+CHUNKSIZE = 2 ** 22
+# number of histogram bins per pass of the streaming median
+_MEDIAN_BINS = 4096
 
 
 class MFArrayMixins:
@@ -10,6 +18,8 @@ class MFArrayMixins:
     def __init__(self):
         self._is_layered = None
         self._flat = None
+        self._how = None
+        self._shape = None
 
     @property
     def raw_values(self):
@@ -23,132 +33,568 @@ class MFArrayMixins:
             "values must be implemented in child class"
         )
 
-    def __iadd__(self, other):
-        if self._is_layered:
-            for mfa in self._flat:
-                mfa += other
-            return self
+    def _inplace_op(self, ufunc, other):
+        """
+        Apply a binary ufunc in place. Scalar operations on CONSTANT and
+        sparse arrays only update the constant or the base value and
+        exceptions; array operations promote the array to INTERNAL storage.
 
-        self._flat += other
-        return self
+        Parameters
+        ----------
+        ufunc : np.ufunc
+        other : scalar, np.ndarray, or MFArray
+
+        Returns
+        -------
+            self
+        """
+        if isinstance(other, MFArrayMixins):
+            other = other.values
 
-    def __imul__(self, other):
         if self._is_layered:
-            for mfa in self._flat:
-                mfa *= other
+            layered_other = np.ndim(other) == len(self._shape)
+            for ix, mfa in enumerate(self._flat):
+                if layered_other:
+                    mfa._inplace_op(ufunc, other[ix])
+                else:
+                    mfa._inplace_op(ufunc, other)
             return self
 
-        self._flat *= other
+        if self._how == How.constant:
+            if np.ndim(other) == 0:
+                # same casting rules as the in place array operation
+                constant = np.array(self._flat)
+                ufunc(constant, other, out=constant)
+                self._flat = constant[()]
+                return self
+            self._promote()
+
+        elif self._how == How.sparse:
+            if np.ndim(other) == 0:
+                self._flat.apply(ufunc, other)
+                return self
+            self._promote()
+
+        raw = self._flat.reshape(self._shape)
+        ufunc(raw, other, out=raw)
         return self
 
-    def __isub__(self, other):
-        if self._is_layered:
-            for mfa in self._flat:
-                mfa -= other
-            return self
+    def __iadd__(self, other):
+        return self._inplace_op(np.add, other)
 
-        self._flat -= other
-        return self
+    def __imul__(self, other):
+        return self._inplace_op(np.multiply, other)
 
-    def __itruediv__(self, other):
-        if self._is_layered:
-            for mfa in self._flat:
-                mfa /= other
-            return self
+    def __isub__(self, other):
+        return self._inplace_op(np.subtract, other)
 
-        self._flat /= other
-        return self
+    def __itruediv__(self, other):
+        return self._inplace_op(np.true_divide, other)
 
     def __ifloordiv__(self, other):
-        if self._is_layered:
-            for mfa in self._flat:
-                mfa /= other
-            return self
-
-        self._flat /= other
-        return self
+        return self._inplace_op(np.floor_divide, other)
 
     def __ipow__(self, other):
-        if self._is_layered:
-            for mfa in self._flat:
-                mfa /= other
-            return self
-
-        self._flat **= other
-        return self
+        return self._inplace_op(np.power, other)
 
     def __add__(self, other):
-        if self._is_layered:
-            for mfa in self._flat:
-                mfa += other
-            return self
-
-        self._flat += other
-        return self
+        return self._inplace_op(np.add, other)
 
     def __mul__(self, other):
-        if self._is_layered:
-            for mfa in self._flat:
-                mfa *= other
-            return self
-
-        self._flat *= other
-        return self
+        return self._inplace_op(np.multiply, other)
 
     def __sub__(self, other):
-        if self._is_layered:
-            for mfa in self._flat:
-                mfa -= other
-            return self
-
-        self._flat -= other
-        return self
+        return self._inplace_op(np.subtract, other)
 
     def __truediv__(self, other):
-        if self._is_layered:
-            for mfa in self._flat:
-                mfa /= other
-            return self
-
-        self._flat /= other
-        return self
+        return self._inplace_op(np.true_divide, other)
 
     def __floordiv__(self, other):
-        if self._is_layered:
-            for mfa in self._flat:
-                mfa /= other
-            return self
-
-        self._flat /= other
-        return self
+        return self._inplace_op(np.floor_divide, other)
 
     def __pow__(self, other):
-        if self._is_layered:
-            for mfa in self._flat:
-                mfa /= other
-            return self
-
-        self._flat **= other
-        return self
+        return self._inplace_op(np.power, other)
 
     def __iter__(self):
         for i in self.raw_values.ravel():
             yield i
 
+    def _constant_value(self):
+        """
+        Return the scaled constant of a CONSTANT array, or None if the
+        array is not a constant.
+        """
+        if self._is_layered or self._how != How.constant:
+            return None
+        return self._flat * self.factor
+
+    def _value_counts(self):
+        """
+        Return the scaled values that are not nan and the number of cells
+        that hold them for a sparse array, or None if the array is not
+        sparse.
+        """
+        if self._is_layered or self._how != How.sparse:
+            return None
+        values, counts = self._flat.value_counts()
+        values = values * self.factor
+        keep = ~np.isnan(values) & (counts > 0)
+        return values[keep], counts[keep]
+
+    def _chunks(self, chunksize=CHUNKSIZE):
+        raise NotImplementedError(
+            "_chunks must be implemented in child class"
+        )
+
+    def _sum_count(self):
+        """
+        Sum and number of the values that are not nan, in a single pass
+        over the value chunks
+        """
+        total, n = 0, 0
+        for chunk in self._chunks():
+            chunk = _valid(chunk)
+            total += chunk.sum()
+            n += chunk.size
+        return total, n
+
+    def _count(self):
+        """
+        Number of values that are not nan
+        """
+        if self._is_layered:
+            return sum(mfa._count() for mfa in self._flat)
+
+        constant = self._constant_value()
+        if constant is not None:
+            return 0 if np.isnan(constant) else int(np.prod(self._shape))
+        value_counts = self._value_counts()
+        if value_counts is not None:
+            return int(value_counts[1].sum())
+        return sum(_valid(chunk).size for chunk in self._chunks())
+
+    def _moments(self):
+        """
+        Count, mean, and sum of squared deviations from the mean of the
+        values that are not nan. Layer and chunk results are combined with
+        the pairwise algorithm of Chan et al.
+        """
+        if self._is_layered:
+            moments = (0, 0., 0.)
+            for mfa in self._flat:
+                moments = _combine_moments(moments, mfa._moments())
+            return moments
+
+        constant = self._constant_value()
+        if constant is not None:
+            n = self._count()
+            return n, constant, 0.
+
+        value_counts = self._value_counts()
+        if value_counts is not None:
+            values, counts = value_counts
+            n = int(counts.sum())
+            if n == 0:
+                return 0, 0., 0.
+            mean = np.sum(values * counts) / n
+            return n, mean, np.sum(counts * (values - mean) ** 2)
+
+        moments = (0, 0., 0.)
+        for chunk in self._chunks():
+            chunk = _valid(chunk)
+            if chunk.size == 0:
+                continue
+            mean = chunk.mean()
+            moments = _combine_moments(
+                moments, (chunk.size, mean, np.sum((chunk - mean) ** 2))
+            )
+        return moments
+
     def min(self):
-        return np.nanmin(self.values)
+        if self._is_layered:
+            return np.nanmin([mfa.min() for mfa in self._flat])
+
+        constant = self._constant_value()
+        if constant is not None:
+            return constant
+        value_counts = self._value_counts()
+        if value_counts is not None:
+            return np.nanmin(value_counts[0]) if value_counts[0].size \
+                else np.nan
+        return _reduce_chunks(np.fmin, self._chunks())
 
     def mean(self):
-        return np.nanmean(self.values)
+        if self._is_layered:
+            count = self._count()
+            if count == 0:
+                return np.nan
+            return self.sum() / count
+
+        constant = self._constant_value()
+        if constant is not None:
+            return constant
+        if self._how == How.sparse:
+            n, mean, _ = self._moments()
+            return mean if n else np.nan
+        total, n = self._sum_count()
+        return total / n if n else np.nan
 
     def median(self):
+        if self._is_layered:
+            constants = [mfa._constant_value() for mfa in self._flat]
+            sparse = [mfa._value_counts() for mfa in self._flat]
+            dense = [
+                mfa for mfa, constant, value_counts in zip(
+                    self._flat, constants, sparse
+                )
+                if constant is None and value_counts is None
+            ]
+            if len(dense) == len(self._flat):
+                if np.prod(self._shape) > CHUNKSIZE:
+                    return _chunked_median(self._chunks)
+                return np.nanmedian(self.values)
+
+            # constant layers enter as a single value weighted by the
+            # number of cells in the layer, sparse layers as their distinct
+            # values weighted by their counts
+            values, counts = [], []
+            for mfa, constant, value_counts in zip(
+                self._flat, constants, sparse
+            ):
+                if value_counts is not None:
+                    values.append(value_counts[0])
+                    counts.append(value_counts[1])
+                elif constant is not None and not np.isnan(constant):
+                    values.append(np.array([constant]))
+                    counts.append(np.array([np.prod(mfa._shape)]))
+            weighted = None
+            if values:
+                weighted = np.concatenate(values), np.concatenate(counts)
+
+            if sum(np.prod(mfa._shape) for mfa in dense) > CHUNKSIZE:
+                # only the dense layers are streamed
+                return _chunked_median(
+                    lambda: (
+                        chunk for mfa in dense for chunk in mfa._chunks()
+                    ),
+                    weighted=weighted,
+                )
+            for mfa in dense:
+                lay_values = mfa.values.ravel()
+                lay_values = lay_values[~np.isnan(lay_values)]
+                values.append(lay_values)
+                counts.append(np.ones(lay_values.size, dtype=np.int64))
+            if not values:
+                return np.nan
+            return _weighted_median(
+                np.concatenate(values), np.concatenate(counts)
+            )
+
+        constant = self._constant_value()
+        if constant is not None:
+            return constant
+        value_counts = self._value_counts()
+        if value_counts is not None:
+            if not value_counts[0].size:
+                return np.nan
+            return _weighted_median(*value_counts)
+        if np.prod(self._shape) > CHUNKSIZE:
+            return _chunked_median(self._chunks)
         return np.nanmedian(self.values)
 
     def max(self):
-        return np.nanmax(self.values)
+        if self._is_layered:
+            return np.nanmax([mfa.max() for mfa in self._flat])
+
+        constant = self._constant_value()
+        if constant is not None:
+            return constant
+        value_counts = self._value_counts()
+        if value_counts is not None:
+            return np.nanmax(value_counts[0]) if value_counts[0].size \
+                else np.nan
+        return _reduce_chunks(np.fmax, self._chunks())
 
     def std(self):
-        return np.nanstd(self.values)
+        if self._is_layered:
+            n, _, m2 = self._moments()
+            if n == 0:
+                return np.nan
+            return np.sqrt(m2 / n)
+
+        constant = self._constant_value()
+        if constant is not None:
+            return np.nan if np.isnan(constant) else 0.
+        n, _, m2 = self._moments()
+        return np.sqrt(m2 / n) if n else np.nan
 
     def sum(self):
-        return np.nansum(self.values)
\ No newline at end of file
+        if self._is_layered:
+            return sum(mfa.sum() for mfa in self._flat)
+
+        constant = self._constant_value()
+        if constant is not None:
+            if np.isnan(constant):
+                return 0.
+            return constant * np.prod(self._shape)
+        value_counts = self._value_counts()
+        if value_counts is not None:
+            return np.sum(value_counts[0] * value_counts[1])
+        return self._sum_count()[0]
+
+
+def _valid(chunk):
+    """
+    Values of a chunk that are not nan
+    """
+    if np.issubdtype(chunk.dtype, np.inexact):
+        return chunk[~np.isnan(chunk)]
+    return chunk
+
+
+def _combine_moments(a, b):
+    """
+    Combine (count, mean, sum of squared deviations) of two sets of values
+    """
+    n, mean, m2 = a
+    nb, mb, m2b = b
+    if nb == 0:
+        return a
+    ntot = n + nb
+    delta = mb - mean
+    mean += delta * nb / ntot
+    m2 += m2b + delta ** 2 * n * nb / ntot
+    return ntot, mean, m2
+
+
+def _reduce_chunks(ufunc, chunks):
+    """
+    Reduce chunks of values with a nan ignoring ufunc like np.fmin
+
+    Returns
+    -------
+        scalar, nan if there are no values
+    """
+    result = None
+    for chunk in chunks:
+        if chunk.size == 0:
+            continue
+        value = ufunc.reduce(chunk)
+        result = value if result is None else ufunc(result, value)
+    return np.nan if result is None else result
+
+
+def _in_range(chunk, lo, hi, closed):
+    """
+    Values of a chunk in [lo, hi], or [lo, hi) when closed is False
+    """
+    if lo == -np.inf and hi == np.inf:
+        return chunk
+    mask = chunk >= lo
+    if closed:
+        mask &= chunk <= hi
+    else:
+        mask &= chunk < hi
+    return chunk[mask]
+
+
+def _chunked_median(
+    chunks, limit=CHUNKSIZE, nbins=_MEDIAN_BINS, weighted=None
+):
+    """
+    Exact median of values that are streamed in chunks
+
+    The chunks are passed over a few times. Every pass builds a histogram
+    of the values in the range that contains the median and narrows the
+    range to the bins of the middle values, until the values left in the
+    range fit in `limit` values and are sorted in memory. When the middle
+    values fall in different bins, they are the largest and smallest
+    values of those bins and are found in one more pass. Ranges too narrow
+    to be split by the bins are narrowed one distinct value at a time.
+
+    Parameters
+    ----------
+    chunks : callable
+        function that returns a new iterator over the value chunks
+    limit : int
+        maximum number of values that are sorted in memory
+    nbins : int
+        number of histogram bins per pass
+    weighted : tuple of np.ndarray, optional
+        (values, counts) of values that each occur counts times, like the
+        values of CONSTANT and sparse layers, that are added to the
+        streamed values without being expanded
+
+    Returns
+    -------
+        float
+    """
+    lo, hi, closed = -np.inf, np.inf, True
+    below = 0
+    ranks = None
+    count = None
+    while True:
+        if count is None or count > limit:
+            count, vmin, vmax = 0, np.inf, -np.inf
+            for values, counts in _median_parts(
+                chunks, weighted, lo, hi, closed
+            ):
+                if values.size:
+                    count += values.size if counts is None \
+                        else int(counts.sum())
+                    vmin = min(vmin, values.min())
+                    vmax = max(vmax, values.max())
+            if ranks is None:
+                if count == 0:
+                    return np.nan
+                ranks = ((count - 1) // 2, count // 2)
+            if vmin == vmax:
+                return float(vmin)
+
+        if count <= limit or not (np.isfinite(vmin) and np.isfinite(vmax)):
+            parts = list(_median_parts(chunks, weighted, lo, hi, closed))
+            values = np.concatenate([values for values, _ in parts])
+            if weighted is None:
+                values.sort()
+                lower = values[ranks[0] - below]
+                upper = values[ranks[1] - below]
+            else:
+                counts = np.concatenate([
+                    np.ones(values.size, dtype=np.int64) if counts is None
+                    else counts
+                    for values, counts in parts
+                ])
+                order = np.argsort(values, kind="stable")
+                values = values[order]
+                cumulative = np.cumsum(counts[order])
+                lower, upper = values[np.searchsorted(
+                    cumulative, np.subtract(ranks, below), side="right"
+                )]
+            return (lower + upper) / 2
+
+        edges = np.linspace(vmin, vmax, nbins + 1)
+        hist = np.zeros(nbins, dtype=np.int64)
+        for values, counts in _median_parts(chunks, weighted, lo, hi, closed):
+            hist += np.histogram(
+                values, bins=edges, weights=counts
+            )[0].astype(np.int64)
+        cumulative = below + np.cumsum(hist)
+        first = np.searchsorted(cumulative, ranks[0], side="right")
+        last = np.searchsorted(cumulative, ranks[1], side="right")
+        if first != last:
+            # the middle values are the largest value of one bin and the
+            # smallest value of a later bin
+            lower = _range_extreme(
+                chunks, weighted, edges[first], edges[first + 1], False,
+                np.max,
+            )
+            if last == nbins - 1:
+                upper = _range_extreme(
+                    chunks, weighted, edges[last], vmax, True, np.min
+                )
+            else:
+                upper = _range_extreme(
+                    chunks, weighted, edges[last], edges[last + 1], False,
+                    np.min,
+                )
+            return (float(lower) + float(upper)) / 2
+        if first > 0:
+            below = cumulative[first - 1]
+        # the histogram gives the number of values left in the range
+        count = int(hist[first:last + 1].sum())
+        previous = lo, hi, closed
+        lo = edges[first]
+        if last == nbins - 1:
+            hi, closed = vmax, True
+        else:
+            hi, closed = edges[last + 1], False
+        if (lo, hi, closed) != previous:
+            continue
+
+        # the range spans too few representable values for the bins to
+        # split it: drop the smallest value from the range instead
+        lo, hi, closed = previous
+        nmin = 0
+        for values, counts in _median_parts(chunks, weighted, lo, hi, closed):
+            if counts is None:
+                nmin += int(np.count_nonzero(values == vmin))
+            else:
+                nmin += int(counts[values == vmin].sum())
+        if ranks[1] - below < nmin:
+            return float(vmin)
+        lo = np.nextafter(float(vmin), np.inf)
+        if ranks[0] - below < nmin:
+            upper = _range_extreme(chunks, weighted, lo, hi, closed, np.min)
+            return (float(vmin) + float(upper)) / 2
+        below += nmin
+        count = None
+
+
+def _median_parts(chunks, weighted, lo, hi, closed):
+    """
+    Values in a range of the streamed chunks and of the weighted values
+
+    Yields
+    ------
+        tuple : (values, counts), where counts is None for chunk values
+    """
+    for chunk in chunks():
+        yield _in_range(_valid(chunk), lo, hi, closed), None
+    if weighted is not None:
+        values, counts = weighted
+        mask = values >= lo
+        if closed:
+            mask &= values <= hi
+        else:
+            mask &= values < hi
+        yield values[mask], counts[mask]
+
+
+def _range_extreme(chunks, weighted, lo, hi, closed, func):
+    """
+    Smallest or largest of the streamed and weighted values in a range
+
+    Parameters
+    ----------
+    chunks : callable
+        function that returns a new iterator over the value chunks
+    weighted : tuple of np.ndarray or None
+        (values, counts) of the weighted values
+    lo, hi : float
+        range bounds
+    closed : bool
+        hi is in the range
+    func : callable
+        np.min or np.max
+
+    Returns
+    -------
+        scalar
+    """
+    extremes = []
+    for values, _ in _median_parts(chunks, weighted, lo, hi, closed):
+        if values.size:
+            extremes.append(func(values))
+    return func(extremes)
+
+
+def _weighted_median(values, counts):
+    """
+    Median of values that each occur counts times
+
+    Parameters
+    ----------
+    values : np.ndarray
+    counts : np.ndarray
+
+    Returns
+    -------
+        float
+    """
+    order = np.argsort(values)
+    values = values[order]
+    cumulative = np.cumsum(counts[order])
+    n = cumulative[-1]
+    lo = values[np.searchsorted(cumulative, (n - 1) // 2, side="right")]
+    hi = values[np.searchsorted(cumulative, n // 2, side="right")]
+    return (lo + hi) / 2
@@ -0,0 +1,620 @@
+import os
+import numpy as np
+from . import profiling
+from .binary import BinaryException, BinaryRecords
+
+
+class HeadFile:
+    """
+    Streaming reader of MODFLOW 6 binary dependent variable output, like
+    heads or concentrations
+
+    The record headers are indexed once with BinaryRecords without reading
+    any values. Time steps and layers are then read by direct access to
+    their records, records can be iterated lazily, and time series of
+    cells are gathered across all records without reading whole layers.
+
+    Parameters
+    ----------
+    fname : str or PathLike
+        binary output file
+    text : str, optional
+        record text to read, like "HEAD". By default the text of the first
+        record
+    precision : str, optional
+        "single" or "double", detected from the file by default
+    bintype : str
+        header type, "vardis", "vardisv", or "vardisu"
+    """
+    def __init__(self, fname, text=None, precision=None, bintype="vardis"):
+        self._fname = fname
+        self._records = BinaryRecords(
+            fname, precision=precision, bintype=bintype
+        )
+        headers = self._records.headers
+        if text is None and len(headers):
+            text = headers["text"][0].decode().strip()
+        self._text = text
+        self._index = self._records.select(text=text) if text is not None \
+            else np.arange(0)
+        headers = headers[self._index]
+
+        # records of every time step, in file order, by layer
+        key = headers["kper"].astype(np.int64) << 32 | headers["kstp"]
+        _, first, step = np.unique(key, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(order.size)
+        step = rank[step.ravel()]
+        first = first[order]
+        self._kstpkper = [
+            (int(kstp), int(kper))
+            for kstp, kper in zip(
+                headers["kstp"][first], headers["kper"][first]
+            )
+        ]
+        self._times = headers["totim"][first].astype(np.float64)
+
+        self._nlay = int(headers["m3"].max()) if len(headers) else 0
+        self._steps = np.full((len(self._kstpkper), self._nlay), -1)
+        self._steps[step, headers["m3"] - 1] = self._index
+        if len(headers):
+            self._shape = (
+                self._nlay, int(headers["m2"][0]), int(headers["m1"][0])
+            )
+        else:
+            self._shape = (0, 0, 0)
+
+    @property
+    def records(self):
+        """
+        Returns
+        -------
+            np.ndarray : headers of the records with the selected text
+        """
+        return self._records.headers[self._index]
+
+    @property
+    def text(self):
+        return self._text
+
+    @property
+    def times(self):
+        """
+        Returns
+        -------
+            np.ndarray : simulation time of every time step
+        """
+        return self._times
+
+    @property
+    def kstpkper(self):
+        """
+        Returns
+        -------
+            list of tuple : one-based (kstp, kper) of every time step
+        """
+        return self._kstpkper
+
+    @property
+    def shape(self):
+        """
+        Returns
+        -------
+            tuple : (nlay, nrow, ncol) of a time step. Vertex and
+            unstructured output has one row
+        """
+        return self._shape
+
+    def __len__(self):
+        return len(self._kstpkper)
+
+    @profiling.profiled("HeadFile.get_data")
+    def get_data(self, totim=None, kstpkper=None, idx=None, layer=None):
+        """
+        Read a time step, or one layer of it
+
+        Parameters
+        ----------
+        totim : float, optional
+            simulation time
+        kstpkper : tuple, optional
+            one-based (kstp, kper)
+        idx : int, optional
+            zero-based time step index. By default the last time step
+        layer : int, optional
+            zero-based layer. By default all layers
+
+        Returns
+        -------
+            np.ndarray : (nlay, nrow, ncol) or (nrow, ncol) for a layer
+        """
+        step = self._step(totim, kstpkper, idx)
+        if layer is not None:
+            data, _ = self._records.read([self._record(step, layer)])
+            return data.reshape(self._shape[1:])
+        records = self._steps[step]
+        if np.any(records < 0):
+            raise BinaryException(
+                f"Time step {self._kstpkper[step]} of {self._fname} does "
+                f"not have a record for every layer."
+            )
+        data, _ = self._records.read(records)
+        return data.reshape(self._shape)
+
+    def iter_data(self, layer=None):
+        """
+        Read the time steps one at a time
+
+        Parameters
+        ----------
+        layer : int, optional
+            zero-based layer. By default all layers are read
+
+        Yields
+        ------
+            tuple : (totim, np.ndarray)
+        """
+        for step, totim in enumerate(self._times):
+            yield totim, self.get_data(idx=step, layer=layer)
+
+    def iter_records(self):
+        """
+        Read the records one at a time, in file order
+
+        Yields
+        ------
+            tuple : (header, np.ndarray)
+        """
+        for index in self._index:
+            data, headers = self._records.read([index])
+            yield headers[0], data[0]
+
+    @profiling.profiled("HeadFile.get_ts")
+    def get_ts(self, cells):
+        """
+        Time series of cells. Only the values of the cells are read, by
+        gathering them from every time step record at once.
+
+        Parameters
+        ----------
+        cells : tuple or list of tuple
+            zero-based (layer, row, col) of the cells, or (layer, cell2d)
+            for vertex output
+
+        Returns
+        -------
+            np.ndarray : (ntimes, 1 + ncells) array with the simulation
+            time in the first column and one column per cell
+        """
+        cells = _cell_list(cells)
+        layers = np.array([cell[0] for cell in cells])
+        within = np.array([
+            np.ravel_multi_index(
+                cell[1:] if len(cell) == 3 else (0,) + tuple(cell[1:]),
+                self._shape[1:],
+            )
+            for cell in cells
+        ])
+        records = self._steps[:, layers]
+        if np.any(records < 0):
+            raise BinaryException(
+                f"{self._fname} does not have a record of every requested "
+                f"layer for every time step."
+            )
+        itemsize = self._records.data_type.itemsize
+        offsets = self._records.offsets[records] + within * itemsize
+        ts = np.empty((len(self._times), len(cells) + 1))
+        ts[:, 0] = self._times
+        ts[:, 1:] = _gather(self._fname, offsets, self._records.data_type)
+        return ts
+
+    def _step(self, totim=None, kstpkper=None, idx=None):
+        if totim is not None:
+            steps = np.flatnonzero(np.isclose(self._times, totim))
+            if not steps.size:
+                raise KeyError(f"time {totim} not found in {self._fname}")
+            return steps[0]
+        if kstpkper is not None:
+            return self._kstpkper.index(tuple(kstpkper))
+        if idx is None:
+            return len(self._times) - 1
+        return idx
+
+    def _record(self, step, layer):
+        record = self._steps[step, layer]
+        if record < 0:
+            raise BinaryException(
+                f"Time step {self._kstpkper[step]} of {self._fname} does "
+                f"not have a record for layer {layer + 1}."
+            )
+        return record
+
+
+class BudgetFile:
+    """
+    Streaming reader of MODFLOW 6 binary budget output
+
+    The record headers, including the list headers of IMETH 6 records, are
+    indexed in one pass that skips over the values. Records are read by
+    direct access, either one at a time while iterating or by selection,
+    and time series of cells are gathered without reading full arrays.
+
+    Parameters
+    ----------
+    fname : str or PathLike
+        binary budget file
+    precision : str, optional
+        "single" or "double", detected from the file by default
+    """
+    def __init__(self, fname, precision=None):
+        self._fname = fname
+        self._size = os.path.getsize(fname)
+        precisions = ("double", "single") if precision is None \
+            else (precision,)
+        for precision in precisions:
+            try:
+                self._records, self._aux = self._scan(precision)
+                break
+            except BinaryException:
+                if precision == precisions[-1]:
+                    raise
+        self._precision = precision
+        self._float_type = np.dtype(
+            np.float64 if precision == "double" else np.float32
+        )
+
+    @property
+    def records(self):
+        """
+        Returns
+        -------
+            np.ndarray : structured array with the header and the offset
+            of the values of every record
+        """
+        return self._records
+
+    @property
+    def precision(self):
+        return self._precision
+
+    @property
+    def texts(self):
+        """
+        Returns
+        -------
+            list of str : record texts, in file order
+        """
+        return _unique_text(self._records["text"])
+
+    @property
+    def times(self):
+        """
+        Returns
+        -------
+            np.ndarray : simulation time of every time step
+        """
+        times = self._records["totim"]
+        _, first = np.unique(times, return_index=True)
+        return times[np.sort(first)].astype(np.float64)
+
+    @property
+    def kstpkper(self):
+        """
+        Returns
+        -------
+            list of tuple : one-based (kstp, kper) of every time step
+        """
+        pairs = self._records[["kstp", "kper"]].tolist()
+        return list(dict.fromkeys((int(a), int(b)) for a, b in pairs))
+
+    def __len__(self):
+        return len(self._records)
+
+    def select(self, text=None, totim=None, kstpkper=None, paknam=None):
+        """
+        Record numbers that match header values
+
+        Parameters
+        ----------
+        text : str, optional
+            budget term, like "FLOW-JA-FACE" or "CHD"
+        totim : float, optional
+            simulation time
+        kstpkper : tuple, optional
+            one-based (kstp, kper)
+        paknam : str, optional
+            package name of IMETH 6 records, matched against the package
+            names of both the source and the destination. Package terms
+            like CHD name their package as the destination
+
+        Returns
+        -------
+            np.ndarray
+        """
+        records = self._records
+        mask = np.ones(len(records), dtype=bool)
+        if text is not None:
+            mask &= _match(records["text"], text)
+        if paknam is not None:
+            mask &= _match(records["paknam"], paknam) | \
+                _match(records["paknam2"], paknam)
+        if totim is not None:
+            mask &= np.isclose(records["totim"], totim)
+        if kstpkper is not None:
+            mask &= (records["kstp"] == kstpkper[0]) & \
+                (records["kper"] == kstpkper[1])
+        return np.flatnonzero(mask)
+
+    def read(self, index):
+        """
+        Read the values of a record
+
+        Parameters
+        ----------
+        index : int
+            record number
+
+        Returns
+        -------
+            np.ndarray : (nlay, nrow, ncol) array for IMETH 1 records, or a
+            structured array with node, node2, q, and auxiliary fields for
+            IMETH 6 records
+        """
+        record = self._records[index]
+        dtype, count = self._record_dtype(index)
+        data = np.fromfile(
+            self._fname, dtype=dtype, count=count, offset=int(record["offset"])
+        )
+        profiling.count(bytes_read=data.nbytes, values=data.size)
+        if record["imeth"] == 1:
+            return data.reshape(
+                abs(int(record["ndim3"])),
+                int(record["ndim2"]),
+                int(record["ndim1"]),
+            )
+        return data
+
+    @profiling.profiled("BudgetFile.get_data")
+    def get_data(self, text=None, totim=None, kstpkper=None, paknam=None):
+        """
+        Read the records that match header values
+
+        Parameters
+        ----------
+        text, totim, kstpkper, paknam
+            see select
+
+        Returns
+        -------
+            list of np.ndarray
+        """
+        return [
+            self.read(index)
+            for index in self.select(text, totim, kstpkper, paknam)
+        ]
+
+    def iter_records(self, text=None, paknam=None):
+        """
+        Read the records one at a time, in file order
+
+        Yields
+        ------
+            tuple : (header, np.ndarray)
+        """
+        for index in self.select(text=text, paknam=paknam):
+            yield self._records[index], self.read(index)
+
+    @profiling.profiled("BudgetFile.get_ts")
+    def get_ts(self, nodes, text, paknam=None):
+        """
+        Time series of a budget term for cells. IMETH 1 values are
+        gathered from every record at once; the flows of IMETH 6 list
+        records are summed by cell.
+
+        Parameters
+        ----------
+        nodes : int or list of int
+            zero-based node numbers
+        text : str
+            budget term
+        paknam : str, optional
+            package name of IMETH 6 records
+
+        Returns
+        -------
+            np.ndarray : (ntimes, 1 + ncells) array with the simulation
+            time in the first column and one column per cell
+        """
+        nodes = np.atleast_1d(np.asarray(nodes, dtype=np.int64))
+        indices = self.select(text=text, paknam=paknam)
+        records = self._records[indices]
+        times, step = np.unique(records["totim"], return_inverse=True)
+        ts = np.zeros((len(times), nodes.size + 1))
+        ts[:, 0] = times
+
+        array = records["imeth"] == 1
+        if np.any(array):
+            offsets = records["offset"][array][:, None] + \
+                nodes * self._float_type.itemsize
+            np.add.at(
+                ts[:, 1:],
+                step[array],
+                _gather(self._fname, offsets, self._float_type),
+            )
+
+        # list records: add the flows of every requested node
+        order = np.argsort(nodes)
+        sorted_nodes = nodes[order] + 1
+        for index, row in zip(indices[~array], step[~array]):
+            data = self.read(index)
+            pos = np.searchsorted(sorted_nodes, data["node"])
+            pos = np.minimum(pos, nodes.size - 1)
+            found = sorted_nodes[pos] == data["node"]
+            np.add.at(ts[row, 1:], order[pos[found]], data["q"][found])
+        return ts
+
+    def _record_dtype(self, index):
+        """
+        Data type and number of values of a record
+        """
+        record = self._records[index]
+        if record["imeth"] == 1:
+            count = int(record["ndim1"]) * int(record["ndim2"]) * \
+                abs(int(record["ndim3"]))
+            return self._float_type, count
+        fields = [("node", "<i4"), ("node2", "<i4"), ("q", self._float_type)]
+        fields += [(name, self._float_type) for name in self._aux[index]]
+        return np.dtype(fields), int(record["nlist"])
+
+    @profiling.profiled("BudgetFile.scan")
+    def _scan(self, precision):
+        """
+        Index the record headers of the file, skipping over the values
+
+        Returns
+        -------
+            tuple : (structured array of record headers, list of the
+            auxiliary variable names of every record)
+        """
+        float_type = "<f8" if precision == "double" else "<f4"
+        itemsize = np.dtype(float_type).itemsize
+        header1 = np.dtype([
+            ("kstp", "<i4"),
+            ("kper", "<i4"),
+            ("text", "S16"),
+            ("ndim1", "<i4"),
+            ("ndim2", "<i4"),
+            ("ndim3", "<i4"),
+        ])
+        header2 = np.dtype([
+            ("imeth", "<i4"),
+            ("delt", float_type),
+            ("pertim", float_type),
+            ("totim", float_type),
+        ])
+        names = np.dtype([
+            ("modelnam", "S16"),
+            ("paknam", "S16"),
+            ("modelnam2", "S16"),
+            ("paknam2", "S16"),
+        ])
+        record_dtype = np.dtype(
+            header1.descr + header2.descr + names.descr +
+            [("nlist", "<i4"), ("offset", "<i8")]
+        )
+        hsize = header1.itemsize + header2.itemsize
+
+        records = []
+        aux = []
+        position = 0
+        with open(self._fname, "rb") as foo:
+            while position < self._size:
+                foo.seek(position)
+                head = foo.read(hsize)
+                if len(head) < hsize:
+                    raise BinaryException(
+                        f"Budget file {self._fname} is truncated at byte "
+                        f"{position}."
+                    )
+                h1 = np.frombuffer(head, header1, count=1)[0]
+                h2 = np.frombuffer(head, header2, count=1,
+                                   offset=header1.itemsize)[0]
+                if not _printable(h1["text"]) or h1["ndim3"] >= 0:
+                    raise BinaryException(
+                        f"Budget file {self._fname} has an invalid record "
+                        f"header at byte {position} for {precision} "
+                        f"precision."
+                    )
+                record = np.zeros(1, dtype=record_dtype)[0]
+                for name in header1.names + header2.names:
+                    record[name] = h1[name] if name in header1.names \
+                        else h2[name]
+                position += hsize
+                imeth = int(h2["imeth"])
+                if imeth == 1:
+                    nbytes = int(h1["ndim1"]) * int(h1["ndim2"]) * \
+                        abs(int(h1["ndim3"])) * itemsize
+                    names_aux = ()
+                elif imeth == 6:
+                    text = foo.read(names.itemsize)
+                    nauxp1 = np.frombuffer(foo.read(4), "<i4")[0]
+                    naux = int(nauxp1) - 1
+                    names_aux = tuple(
+                        name.decode().strip()
+                        for name in np.frombuffer(
+                            foo.read(16 * naux), "S16", count=naux
+                        )
+                    )
+                    nlist = int(np.frombuffer(foo.read(4), "<i4")[0])
+                    for name, value in zip(
+                        names.names, np.frombuffer(text, names)[0]
+                    ):
+                        record[name] = value
+                    if not _printable(record["modelnam"]):
+                        raise BinaryException(
+                            f"Budget file {self._fname} has an invalid "
+                            f"list header at byte {position}."
+                        )
+                    record["nlist"] = nlist
+                    position += names.itemsize + 8 + 16 * naux
+                    nbytes = nlist * (8 + itemsize * (1 + naux))
+                else:
+                    raise BinaryException(
+                        f"Budget file {self._fname} record at byte "
+                        f"{position - hsize} has unsupported IMETH {imeth}."
+                    )
+                record["offset"] = position
+                position += nbytes
+                records.append(record)
+                aux.append(names_aux)
+        if position != self._size:
+            raise BinaryException(
+                f"Budget file {self._fname} is truncated: the last record "
+                f"ends at byte {position} of {self._size}."
+            )
+        return np.array(records, dtype=record_dtype), aux
+
+
+def _gather(fname, offsets, dtype):
+    """
+    Read single values at byte offsets of a file. Only the pages that hold
+    the values are read.
+
+    Parameters
+    ----------
+    fname : str or PathLike
+    offsets : np.ndarray
+        byte offsets of the values
+    dtype : np.dtype
+
+    Returns
+    -------
+        np.ndarray : values with the shape of offsets
+    """
+    dtype = np.dtype(dtype)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if offsets.size == 0:
+        return np.empty(offsets.shape, dtype=dtype)
+    raw = np.memmap(fname, dtype=np.uint8, mode="r")
+    data = raw[offsets[..., np.newaxis] + np.arange(dtype.itemsize)]
+    profiling.count(bytes_read=data.nbytes, values=offsets.size)
+    return data.view(dtype)[..., 0]
+
+
+def _cell_list(cells):
+    if isinstance(cells, tuple) and not isinstance(cells[0], tuple):
+        return [cells]
+    return list(cells)
+
+
+def _match(texts, text):
+    return np.char.upper(np.char.strip(texts)) == text.strip().upper().encode()
+
+
+def _printable(text):
+    return all(32 <= c < 127 for c in text)
+
+
+def _unique_text(texts):
+    return list(dict.fromkeys(text.decode().strip() for text in texts))
@@ -0,0 +1,366 @@
+import functools
+import threading
+import time
+
+
+# the active Profiler, None while instrumentation is disabled. Every hook
+# checks this global first, so disabled instrumentation costs one global
+# lookup per call
+_profiler = None
+_local = threading.local()
+
+# counters summed by Profiler.report
+_COUNTERS = (
+    "wall_time",
+    "bytes_read",
+    "bytes_written",
+    "values",
+    "tokenize_time",
+    "convert_time",
+)
+
+
+class Event:
+    """
+    Counters of one instrumented call. Counters include the work of nested
+    instrumented calls made by the same thread, like the wall time does.
+
+    Attributes
+    ----------
+    name : str
+        instrumented function, like "MFArray.load" or "f_to_array"
+    path : str or None
+        file the call read or wrote, when known
+    parent : str or None
+        name of the instrumented call this call was made from
+    nested : bool
+        the call was made from within another call of the same name, like
+        the layers of a layered MFArray.write. Nested events are left out
+        of the counters of Profiler.report, which would count them twice
+    wall_time : float
+        seconds spent in the call
+    bytes_read : int
+        bytes read from disk. For text files this is the number of
+        characters
+    bytes_written : int
+        bytes written to disk, or characters for text files
+    values : int
+        number of values parsed or written
+    tokenize_time : float
+        seconds spent reading text and splitting it into array blocks
+    convert_time : float
+        seconds spent converting text to numbers
+    allocations : list of int
+        sizes in bytes of the arrays allocated by the call
+    """
+    __slots__ = (
+        "name",
+        "path",
+        "parent",
+        "nested",
+        "allocations",
+    ) + _COUNTERS
+
+    def __init__(self, name, parent=None, nested=False):
+        self.name = name
+        self.path = None
+        self.parent = parent
+        self.nested = nested
+        self.allocations = []
+        for counter in _COUNTERS:
+            setattr(self, counter, 0)
+
+    def as_dict(self):
+        """
+        Returns
+        -------
+            dict : event attributes
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"Event({self.name}, {self.wall_time:.6f} s, " \
+               f"{self.bytes_read} bytes read, {self.values} values)"
+
+
+class Profiler:
+    """
+    Collect instrumentation events of the flopy4.data load and write paths
+
+    Instrumentation is enabled while the profiler is used as a context
+    manager, or between enable() and disable().
+
+    Parameters
+    ----------
+    callbacks : list of callable, optional
+        functions called with every Event when an instrumented call
+        finishes, for example to forward the events to job telemetry.
+        Callbacks are called from the thread that made the call
+
+    Notes
+    -----
+    Calls made by worker threads, like the parallel loading of layers, are
+    recorded as separate events without a parent. Calls made in worker
+    processes are not recorded.
+
+    Examples
+    --------
+    >>> with Profiler() as profiler:
+    ...     mfa = MFArray.load(f, cwd, shape)
+    >>> profiler.report()["f_to_array"]["values"]
+    """
+    def __init__(self, callbacks=None):
+        self.events = []
+        self._callbacks = list(callbacks or [])
+        self._lock = threading.Lock()
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = _profiler
+        enable(self)
+        return self
+
+    def __exit__(self, *exc):
+        if self._previous is None:
+            disable()
+        else:
+            enable(self._previous)
+        self._previous = None
+
+    def add_callback(self, callback):
+        self._callbacks.append(callback)
+
+    def clear(self):
+        """
+        Remove the recorded events
+        """
+        with self._lock:
+            self.events = []
+
+    def report(self):
+        """
+        Summarize the recorded events by name
+
+        Returns
+        -------
+            dict : event name and a dict with the number of calls, the sum
+            of every counter, and the number and total size of the
+            allocations. Counters of nested events are not added
+        """
+        report = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            summary = report.setdefault(
+                event.name,
+                dict(
+                    calls=0,
+                    allocations=0,
+                    allocated_bytes=0,
+                    **{counter: 0 for counter in _COUNTERS},
+                ),
+            )
+            summary["calls"] += 1
+            if event.nested:
+                continue
+            summary["allocations"] += len(event.allocations)
+            summary["allocated_bytes"] += sum(event.allocations)
+            for counter in _COUNTERS:
+                summary[counter] += getattr(event, counter)
+        return report
+
+    def _emit(self, event):
+        with self._lock:
+            self.events.append(event)
+        for callback in self._callbacks:
+            callback(event)
+
+
+def enable(profiler=None):
+    """
+    Enable instrumentation
+
+    Parameters
+    ----------
+    profiler : Profiler, optional
+        profiler that collects the events, by default a new one
+
+    Returns
+    -------
+        Profiler
+    """
+    global _profiler
+    if profiler is None:
+        profiler = Profiler()
+    _profiler = profiler
+    return profiler
+
+
+def disable():
+    """
+    Disable instrumentation
+    """
+    global _profiler
+    _profiler = None
+
+
+def active():
+    """
+    Returns
+    -------
+        Profiler or None : the active profiler
+    """
+    return _profiler
+
+
+class _Span:
+    """
+    Context manager that records one Event
+    """
+    __slots__ = ("_profiler", "_event", "_start")
+
+    def __init__(self, profiler, name):
+        stack = _stack()
+        parent = stack[-1].name if stack else None
+        nested = any(event.name == name for event in stack)
+        self._profiler = profiler
+        self._event = Event(name, parent, nested)
+
+    def __enter__(self):
+        _stack().append(self._event)
+        self._start = time.perf_counter()
+        return self._event
+
+    def __exit__(self, *exc):
+        self._event.wall_time = time.perf_counter() - self._start
+        _stack().pop()
+        self._profiler._emit(self._event)
+
+
+class _Timer:
+    """
+    Context manager that adds the elapsed time to a counter of the open
+    events
+    """
+    __slots__ = ("_counter", "_start")
+
+    def __init__(self, counter):
+        self._counter = counter
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        count(**{self._counter: time.perf_counter() - self._start})
+
+
+class _Null:
+    """
+    Context manager that does nothing, used while disabled
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NULL = _Null()
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def span(name):
+    """
+    Record a block of code as an instrumented call
+
+    Parameters
+    ----------
+    name : str
+        event name
+
+    Returns
+    -------
+        context manager
+    """
+    if _profiler is None:
+        return _NULL
+    return _Span(_profiler, name)
+
+
+def profiled(name):
+    """
+    Decorator that records every call of a function as an event
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            with _Span(_profiler, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timer(counter):
+    """
+    Add the time spent in a block of code to a counter of the open events,
+    like "tokenize_time" or "convert_time"
+
+    Returns
+    -------
+        context manager
+    """
+    if _profiler is None:
+        return _NULL
+    return _Timer(counter)
+
+
+def count(**counters):
+    """
+    Add to counters of the open events of the calling thread, for example
+    count(bytes_read=n, values=m)
+    """
+    if _profiler is None:
+        return
+    for event in getattr(_local, "stack", ()):
+        for counter, value in counters.items():
+            setattr(event, counter, getattr(event, counter) + value)
+
+
+def annotate(path):
+    """
+    Set the file path of the innermost open event
+    """
+    if _profiler is None:
+        return
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].path = str(path)
+
+
+def allocated(array):
+    """
+    Record the allocation of an array in the open events
+
+    Parameters
+    ----------
+    array : np.ndarray
+
+    Returns
+    -------
+        np.ndarray : the array
+    """
+    if _profiler is None:
+        return array
+    for event in getattr(_local, "stack", ()):
+        event.allocations.append(array.nbytes)
+    return array
@@ -0,0 +1,221 @@
+import re
+import numpy as np
+from . import profiling
+
+
+# number of characters pulled from the file handle per read
+CHUNKSIZE = 2 ** 22
+
+# a line that ends a free format array block: a blank line, a comment line,
+# or a line that starts with a keyword (INTERNAL, CONSTANT, OPEN/CLOSE,
+# END, the next variable name, ...)
+_TERMINATOR = re.compile(r"^[ \t]*(?:\n|[A-Za-z#;]|!!)", re.M)
+_COMMENT = re.compile(r"(?:[;#]|!!)[^\n]*")
+_TRANSLATE = str.maketrans({",": " ", "D": "E", "d": "e"})
+
+
+def read_array_block(f, count=None, dtype=np.float64, chunksize=CHUNKSIZE):
+    """
+    Read a free format block of numbers from an open text file handle
+
+    The block is read in chunks of `chunksize` characters and each chunk
+    is converted to numbers in a single vectorized call. The block ends at
+    the first blank line, comment line, or line that starts with a keyword.
+    On return the file handle is positioned at the start of that line.
+
+    Parameters
+    ----------
+    f : file object
+        open text file handle positioned at the first line of data
+    count : int, optional
+        number of values expected in the block. When given the number of
+        values read is checked
+    dtype : np.dtype
+        data type of the returned array
+    chunksize : int
+        number of characters to read from the file handle at once
+
+    Returns
+    -------
+        np.ndarray : flat array of values
+    """
+    parts = []
+    nread = 0
+    for values in iter_array_block(f, dtype=dtype, chunksize=chunksize):
+        parts.append(values)
+        nread += values.size
+
+    if count is not None and nread != count:
+        raise ValueError(
+            f"Expected {count} values in array block but found {nread}"
+        )
+
+    if not parts:
+        return np.array([], dtype=dtype)
+    elif len(parts) == 1:
+        return parts[0]
+    return profiling.allocated(np.concatenate(parts))
+
+
+def iter_array_block(f, dtype=np.float64, chunksize=CHUNKSIZE):
+    """
+    Iterate over a free format block of numbers one chunk at a time,
+    without holding the whole block in memory
+
+    Parameters
+    ----------
+    f : file object
+        open text file handle positioned at the first line of data
+    dtype : np.dtype
+        data type of the yielded arrays
+    chunksize : int
+        number of characters to read from the file handle at once
+
+    Yields
+    ------
+        np.ndarray : flat array of the values in a chunk
+    """
+    blocks = iter_block_text(f, chunksize=chunksize)
+    while True:
+        with profiling.timer("tokenize_time"):
+            block = next(blocks, None)
+        if block is None:
+            return
+        with profiling.timer("convert_time"):
+            values = _convert(block, dtype)
+        profiling.count(values=values.size)
+        yield profiling.allocated(values)
+
+
+def iter_block_text(f, terminator=_TERMINATOR, chunksize=CHUNKSIZE):
+    """
+    Iterate over the text of a block in chunks of complete lines
+
+    Parameters
+    ----------
+    f : file object
+        open text file handle positioned at the first line of the block
+    terminator : re.Pattern
+        multiline pattern that matches at the start of the line that ends
+        the block. On return the file handle is positioned at the start of
+        that line
+    chunksize : int
+        number of characters to read from the file handle at once
+
+    Yields
+    ------
+        str : one or more complete lines of the block
+    """
+    carry = ""
+    carry_pos, carry_skip = f.tell(), 0
+    while True:
+        chunk_pos = f.tell()
+        chunk = f.read(chunksize)
+        profiling.count(bytes_read=len(chunk))
+        if not chunk:
+            # last line of the file may not have a line ending
+            text = carry + "\n" if carry else ""
+            end = len(text)
+            ncarry = 0
+        else:
+            text = carry + chunk
+            end = text.rfind("\n") + 1
+            ncarry = len(carry)
+
+        match = terminator.search(text, 0, end)
+        if match is not None:
+            end = match.start()
+
+        if end > 0:
+            yield text[:end]
+
+        if match is not None:
+            # rewind the handle to the start of the terminating line
+            if chunk and end >= ncarry:
+                f.seek(chunk_pos)
+                f.read(end - ncarry)
+            else:
+                f.seek(carry_pos)
+                f.read(carry_skip)
+            return
+
+        if not chunk:
+            return
+
+        if end > ncarry:
+            carry_pos, carry_skip = chunk_pos, end - ncarry
+        carry = text[end:]
+
+
+def line_strip(line):
+    """
+    Remove comments and replace commas in a line of a free format MODFLOW
+    input file
+
+    Parameters
+    ----------
+    line : str
+
+    Returns
+    -------
+        str : line without comments and with commas replaced by spaces
+    """
+    for comment_flag in [";", "#", "!!"]:
+        line = line.split(comment_flag)[0]
+    line = line.strip()
+    return line.replace(",", " ")
+
+
+def multi_line_strip(f):
+    """
+    Read the next line of a free format MODFLOW input file that is not
+    blank or a comment
+
+    Parameters
+    ----------
+    f : file object
+        open text file handle
+
+    Returns
+    -------
+        str : lower case line without comments and with commas replaced
+    """
+    while True:
+        line = line_strip(f.readline())
+        if line:
+            return line.lower()
+
+
+def _convert(text, dtype=np.float64):
+    """
+    Convert a string of whitespace or comma separated numbers to an array
+
+    Fortran double precision exponents (1.0D+02) and repeat counts (n*value)
+    are supported.
+
+    Parameters
+    ----------
+    text : str
+        string of free format numbers
+    dtype : np.dtype
+        data type of the returned array
+
+    Returns
+    -------
+        np.ndarray
+    """
+    if "#" in text or ";" in text or "!" in text:
+        text = _COMMENT.sub("", text)
+    text = text.translate(_TRANSLATE)
+    if "*" not in text:
+        return np.fromstring(text, dtype=dtype, sep=" ")
+
+    tokens = np.array(text.split())
+    repeat = np.char.find(tokens, "*") >= 0
+    counts = np.ones(tokens.size, dtype=np.int64)
+    values = np.empty(tokens.size, dtype=dtype)
+    parts = np.char.partition(tokens[repeat], "*")
+    counts[repeat] = parts[:, 0].astype(np.int64)
+    values[repeat] = parts[:, 2].astype(dtype)
+    values[~repeat] = tokens[~repeat].astype(dtype)
+    return np.repeat(values, counts)
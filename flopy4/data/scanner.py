@@ -0,0 +1,378 @@
+import mmap
+import re
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .constants import CommonNames
+from .mfarray import MFArray
+from .mflist import MFList
+
+
+# a line that starts with a word. Lines of numbers, which make up almost
+# all of a large package file, never match and are skipped by the regular
+# expression engine without a round trip through python
+_WORD_LINE = re.compile(rb"^[ \t]*([A-Za-z][^\s]*)([^\n]*)", re.M)
+_CONTROL = {
+    CommonNames.internal.encode(),
+    CommonNames.constant.encode(),
+    CommonNames.external.encode(),
+}
+
+
+class ControlRecord:
+    """
+    Array or list control record, like "OPEN/CLOSE k.txt FACTOR 0.1"
+
+    Parameters
+    ----------
+    offset : int
+        byte offset of the control record line
+    how : str
+        INTERNAL, CONSTANT, or OPEN/CLOSE
+    tokens : list of str
+        remaining tokens of the control record line
+    """
+    def __init__(self, offset, how, tokens):
+        self.offset = offset
+        self.how = how
+        self.tokens = tokens
+
+    @property
+    def fname(self):
+        """
+        Returns
+        -------
+            str or None : OPEN/CLOSE file name
+        """
+        if self.how == CommonNames.external and self.tokens:
+            return self.tokens[0]
+        return None
+
+    @property
+    def binary(self):
+        return CommonNames.binary in [s.upper() for s in self.tokens]
+
+    @property
+    def factor(self):
+        return self._keyword_value(CommonNames.factor)
+
+    @property
+    def iprn(self):
+        return self._keyword_value(CommonNames.iprn)
+
+    def _keyword_value(self, keyword):
+        upper = [s.upper() for s in self.tokens]
+        if keyword in upper:
+            idx = upper.index(keyword)
+            if idx + 1 < len(self.tokens):
+                return self.tokens[idx + 1]
+        return None
+
+    def __repr__(self):
+        return f"ControlRecord({self.offset}, {self.how} " \
+               f"{' '.join(self.tokens)})"
+
+
+class BlockIndex:
+    """
+    Byte offsets of a BEGIN/END block
+
+    Parameters
+    ----------
+    name : str
+        lower case block name, like "griddata" or "period"
+    suffix : str or None
+        text after the block name, like the stress period number
+    start : int
+        byte offset of the BEGIN line
+    data_start : int
+        byte offset of the first line after the BEGIN line
+    """
+    def __init__(self, name, suffix, start, data_start):
+        self.name = name
+        self.suffix = suffix
+        self.start = start
+        self.data_start = data_start
+        self.end = None
+        self.records = []
+
+    def __repr__(self):
+        suffix = "" if self.suffix is None else f" {self.suffix}"
+        return f"BlockIndex({self.name}{suffix}, {self.start}:{self.end})"
+
+
+class ArrayIndex:
+    """
+    Byte offsets of the control records of an array variable
+
+    Parameters
+    ----------
+    name : str
+        lower case variable name
+    block : BlockIndex
+        block that contains the array
+    layered : bool
+        the array has one control record per layer
+    """
+    def __init__(self, name, block, layered):
+        self.name = name
+        self.block = block
+        self.layered = layered
+        self.records = []
+
+    @property
+    def offset(self):
+        """
+        Returns
+        -------
+            int : byte offset of the first control record
+        """
+        return self.records[0].offset
+
+    def __repr__(self):
+        return f"ArrayIndex({self.name}, {len(self.records)} records)"
+
+
+class FileIndex:
+    """
+    Index of the blocks, array control records, and PERIOD blocks of a
+    MODFLOW 6 package file, built in a single pass over the file
+
+    Arrays and stress periods can be loaded by seeking to their offset,
+    without reading the rest of the file.
+
+    Parameters
+    ----------
+    fpath : Path
+        package file path
+    blocks : list of BlockIndex
+    arrays : list of ArrayIndex
+    """
+    def __init__(self, fpath, blocks, arrays):
+        self._fpath = Path(fpath)
+        self.blocks = blocks
+        self.arrays = arrays
+
+    @classmethod
+    def scan(cls, fpath):
+        """
+        Scan a package file
+
+        Parameters
+        ----------
+        fpath : str or PathLike
+            package file path
+
+        Returns
+        -------
+            FileIndex
+        """
+        blocks = []
+        arrays = []
+        with open(fpath, "rb") as foo:
+            if foo.seek(0, 2) == 0:
+                return cls(fpath, blocks, arrays)
+            with mmap.mmap(foo.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                block = None
+                variable = None
+                for match in _WORD_LINE.finditer(mm):
+                    word = match.group(1).upper()
+                    rest = match.group(2).split()
+                    if word == b"BEGIN" and rest:
+                        block = BlockIndex(
+                            rest[0].decode().lower(),
+                            rest[1].decode() if len(rest) > 1 else None,
+                            match.start(),
+                            min(match.end() + 1, len(mm)),
+                        )
+                        blocks.append(block)
+                        variable = None
+                    elif word == b"END":
+                        if block is not None:
+                            block.end = match.start()
+                        block = None
+                        variable = None
+                    elif block is None:
+                        continue
+                    elif word in _CONTROL:
+                        record = ControlRecord(
+                            match.start(),
+                            word.decode(),
+                            [token.decode() for token in rest],
+                        )
+                        block.records.append(record)
+                        if variable is not None:
+                            if not variable.records:
+                                arrays.append(variable)
+                            variable.records.append(record)
+                    else:
+                        # a variable name, possibly followed by LAYERED,
+                        # or an option line without control records
+                        layered = b"LAYERED" in [s.upper() for s in rest]
+                        variable = ArrayIndex(
+                            word.decode().lower(), block, layered
+                        )
+        return cls(fpath, blocks, arrays)
+
+    @property
+    def fpath(self):
+        return self._fpath
+
+    @property
+    def periods(self):
+        """
+        Returns
+        -------
+            dict : zero based stress period number and BlockIndex of the
+            PERIOD blocks
+        """
+        return {
+            int(block.suffix) - 1: block
+            for block in self.blocks
+            if block.name == "period" and block.suffix is not None
+        }
+
+    def block(self, name, suffix=None):
+        """
+        Find a block by name
+
+        Parameters
+        ----------
+        name : str
+            block name
+        suffix : str, optional
+            text after the block name, like the stress period number
+
+        Returns
+        -------
+            BlockIndex
+        """
+        name = name.lower()
+        for block in self.blocks:
+            if block.name == name and \
+                    (suffix is None or block.suffix == str(suffix)):
+                return block
+        raise KeyError(f"block {name} not found in {self._fpath}")
+
+    def array(self, name, block=None):
+        """
+        Find an array variable by name
+
+        Parameters
+        ----------
+        name : str
+            variable name
+        block : BlockIndex, optional
+            block to search, for example a PERIOD block. By default the
+            first array with the name is returned
+
+        Returns
+        -------
+            ArrayIndex
+        """
+        name = name.lower()
+        for array in self.arrays:
+            if array.name == name and (block is None or array.block is block):
+                return array
+        raise KeyError(f"array {name} not found in {self._fpath}")
+
+    def load_array(self, name, shape, cwd=None, block=None, **kwargs):
+        """
+        Load an array by seeking to its first control record
+
+        Parameters
+        ----------
+        name : str
+            variable name
+        shape : tuple
+            array shape
+        cwd : Path, optional
+            directory that OPEN/CLOSE paths are relative to, by default the
+            directory of the package file
+        block : BlockIndex, optional
+            block that contains the array
+        **kwargs
+            passed to MFArray.load
+
+        Returns
+        -------
+            MFArray
+        """
+        array = self.array(name, block)
+        if cwd is None:
+            cwd = self._fpath.parent
+        with open(self._fpath) as f:
+            f.seek(array.offset)
+            return MFArray.load(
+                f, Path(cwd), shape, layered=array.layered, **kwargs
+            )
+
+    def load_arrays(self, shapes, cwd=None, workers=None, **kwargs):
+        """
+        Load several arrays, optionally in parallel. Every array is read
+        through its own file handle.
+
+        Parameters
+        ----------
+        shapes : dict
+            variable name and array shape
+        cwd : Path, optional
+            directory that OPEN/CLOSE paths are relative to
+        workers : int, optional
+            number of threads. By default the arrays are loaded one after
+            another
+        **kwargs
+            passed to MFArray.load
+
+        Returns
+        -------
+            dict : variable name and MFArray
+        """
+        def load(name):
+            return self.load_array(name, shapes[name], cwd=cwd, **kwargs)
+
+        if workers is None or workers < 2:
+            return {name: load(name) for name in shapes}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(shapes, executor.map(load, shapes)))
+
+    def load_periods(
+        self,
+        fields,
+        kpers=None,
+        cwd=None,
+        aux=None,
+        boundnames=False,
+        grid_type=CommonNames.structured,
+    ):
+        """
+        Load PERIOD blocks of a list package by seeking to each block
+
+        Parameters
+        ----------
+        fields : list of (str, np.dtype)
+        kpers : list of int, optional
+            zero based stress periods to load, by default all periods
+        cwd : Path, optional
+            directory that OPEN/CLOSE paths are relative to
+        aux : list of str, optional
+        boundnames : bool
+        grid_type : str
+
+        Returns
+        -------
+            MFList
+        """
+        periods = self.periods
+        if kpers is None:
+            kpers = sorted(periods)
+        if cwd is None:
+            cwd = self._fpath.parent
+        mfl = MFList(
+            fields=fields, aux=aux, boundnames=boundnames, grid_type=grid_type
+        )
+        with open(self._fpath) as f:
+            for kper in np.atleast_1d(kpers):
+                f.seek(periods[int(kper)].data_start)
+                mfl._store(int(kper), mfl._load_period(f, Path(cwd)))
+        return mfl
@@ -0,0 +1,239 @@
+import numpy as np
+import weakref
+from multiprocessing import shared_memory
+from .constants import How
+from .mfarray import MFArray
+
+
+# shared memory blocks mapped by this process, by name. Arrays only hold a
+# view of the mapping, so the blocks are kept open here until they are
+# explicitly closed: closing a block that is still viewed by an array
+# invalidates the array memory
+_BLOCKS = {}
+
+# arrays of this process that use a block as their storage, by block name.
+# Closing a block moves their values back to private memory first
+_BOUND = {}
+
+
+class SharedArrayHandle:
+    """
+    Picklable handle to the values of an MFArray in a shared memory block
+
+    The handle only holds the block name, the shape and data type, and the
+    per-layer metadata (storage, factor, and OPEN/CLOSE file), so sending
+    it to a worker process is cheap. Workers attach to the block without
+    copying and read or update the values in place; updates are seen by
+    every process attached to the block.
+
+    Handles are created with MFArray.to_shared().
+
+    Parameters
+    ----------
+    name : str
+        shared memory block name
+    shape : tuple
+        array shape
+    dtype : np.dtype
+        data type of the values
+    layers : list of tuple
+        (how, factor, path, fname, binary) of every layer, or of the whole
+        array for arrays that are not layered
+    layered : bool
+
+    Examples
+    --------
+    >>> handle = mfa.to_shared()
+    >>> with ProcessPoolExecutor() as executor:
+    ...     list(executor.map(perturb, [handle] * 8))
+    >>> handle.unlink()
+
+    where perturb calls handle.attach() to get an MFArray view of the block.
+    """
+    def __init__(self, name, shape, dtype, layers, layered=False):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.layers = layers
+        self.layered = layered
+
+    @classmethod
+    def create(cls, mfa):
+        """
+        Copy the values of an MFArray into a new shared memory block and
+        make the array use the block as its storage. CONSTANT and sparse
+        storage is expanded to INTERNAL, so the values can be updated in
+        place by any process.
+
+        Parameters
+        ----------
+        mfa : MFArray
+
+        Returns
+        -------
+            SharedArrayHandle
+        """
+        values = mfa.raw_values
+        shm = shared_memory.SharedMemory(
+            create=True, size=max(values.nbytes, 1)
+        )
+        _BLOCKS[shm.name] = shm
+
+        layers = mfa._flat if mfa._is_layered else [mfa]
+        handle = cls(
+            shm.name,
+            mfa._shape,
+            mfa.dtype,
+            [_layer_metadata(layer) for layer in layers],
+            layered=mfa._is_layered,
+        )
+        buffer = handle._buffer(shm)
+        buffer[...] = values.reshape(buffer.shape)
+        handle._bind(mfa, buffer)
+        return handle
+
+    def attach(self):
+        """
+        Attach to the shared memory block
+
+        Returns
+        -------
+            MFArray : array whose values are a view of the block
+        """
+        shm = _BLOCKS.get(self.name)
+        if shm is None:
+            shm = shared_memory.SharedMemory(name=self.name)
+            _BLOCKS[self.name] = shm
+        buffer = self._buffer(shm)
+
+        layer_shape = self.shape[1:] if self.layered else self.shape
+        layers = [
+            MFArray(
+                None,
+                layer_shape,
+                how,
+                factor=factor,
+                path=path,
+                binary=binary,
+                fname=fname,
+                dtype=self.dtype,
+            )
+            for how, factor, path, fname, binary in self.layers
+        ]
+        if self.layered:
+            mfa = MFArray(
+                np.array(layers, dtype=object),
+                self.shape,
+                how=None,
+                layered=True,
+                dtype=self.dtype,
+            )
+        else:
+            mfa = layers[0]
+        self._bind(mfa, buffer)
+        return mfa
+
+    def close(self):
+        """
+        Unmap the block from this process. The values of the arrays of this
+        process that use the block, including the array the block was
+        created from, are copied to private memory first, so the arrays
+        remain valid but no longer share their updates.
+        """
+        shm = _BLOCKS.pop(self.name, None)
+        if shm is None:
+            return
+        buffer = self._buffer(shm)
+        for mfa in _BOUND.pop(self.name, ()):
+            _unbind(mfa, buffer)
+        del buffer
+        shm.close()
+
+    def unlink(self):
+        """
+        Free the block once every process has closed it or exited. Arrays
+        that already use the block remain valid until it is closed.
+        """
+        shm = _BLOCKS.get(self.name)
+        if shm is None:
+            shm = shared_memory.SharedMemory(name=self.name)
+            _BLOCKS[self.name] = shm
+        shm.unlink()
+
+    def _buffer(self, shm):
+        """
+        View of a block as the flat storage of an array, or as the
+        (nlay, ncpl) buffer of a layered array
+        """
+        if self.layered:
+            shape = (self.shape[0], int(np.prod(self.shape[1:])))
+        else:
+            shape = (int(np.prod(self.shape)),)
+        return np.ndarray(shape, dtype=self.dtype, buffer=shm.buf)
+
+    def _bind(self, mfa, buffer):
+        """
+        Make the storage of an array, or of each of its layers, a view of
+        the shared buffer
+        """
+        _BOUND.setdefault(self.name, weakref.WeakSet()).add(mfa)
+        if not mfa._is_layered:
+            _bind_layer(mfa, buffer)
+            return
+        mfa._buffer = buffer
+        for layer, row in zip(mfa._flat, buffer):
+            _bind_layer(layer, row)
+
+    def __repr__(self):
+        return f"SharedArrayHandle({self.name}, {self.shape}, {self.dtype})"
+
+
+def _layer_metadata(mfa):
+    """
+    Storage metadata of an array or layer in shared memory. CONSTANT and
+    sparse storage becomes INTERNAL.
+    """
+    how = mfa._how
+    if how in (How.constant, How.sparse):
+        how = How.internal
+    path = None if mfa._path is None else str(mfa._path)
+    return how, mfa._factor, path, mfa._fname, mfa._binary
+
+
+def _bind_layer(mfa, row):
+    if mfa._how in (How.constant, How.sparse):
+        mfa._how = How.internal
+    mfa._row = row
+    mfa._array = row
+
+
+def _unbind(mfa, buffer):
+    """
+    Copy the storage of an array, or of each of its layers, that is a view
+    of a shared buffer to private memory
+    """
+    if not mfa._is_layered:
+        _unbind_layer(mfa, buffer)
+        return
+    if mfa._buffer is not None and np.may_share_memory(mfa._buffer, buffer):
+        mfa._buffer = mfa._buffer.copy()
+        for layer, row in zip(mfa._flat, mfa._buffer):
+            if _shares(layer._array, buffer):
+                layer._array = row
+            layer._row = row
+    for layer in mfa._flat:
+        _unbind_layer(layer, buffer)
+
+
+def _unbind_layer(mfa, buffer):
+    same = mfa._row is mfa._array
+    if _shares(mfa._array, buffer):
+        mfa._array = mfa._array.copy()
+    if _shares(mfa._row, buffer):
+        mfa._row = mfa._array if same else mfa._row.copy()
+
+
+def _shares(array, buffer):
+    return isinstance(array, np.ndarray) and \
+        np.may_share_memory(array, buffer)
+
@@ -0,0 +1,324 @@
+import numpy as np
+
+
+# fraction of cells that may differ from the base value before sparse
+# storage is expanded to a dense INTERNAL array
+SPARSE_THRESHOLD = 0.1
+
+
+class SparseValues:
+    """
+    Flat array storage as a base value with sparse exceptions
+
+    Parameters
+    ----------
+    base : float
+        value of every cell that is not an exception
+    size : int
+        number of cells
+    index : np.ndarray, optional
+        sorted flat indices of the exceptions
+    data : np.ndarray, optional
+        exception values
+    dtype : np.dtype, optional
+        data type of the values, by default the type of data or float64
+    """
+    def __init__(self, base, size, index=None, data=None, dtype=None):
+        if dtype is None:
+            dtype = np.float64 if data is None else np.asarray(data).dtype
+        self.dtype = np.dtype(dtype)
+        self.base = self.dtype.type(base)
+        self.size = size
+        if index is None:
+            index = np.empty(0, dtype=np.int64)
+            data = np.empty(0, dtype=self.dtype)
+        self.index = np.asarray(index, dtype=np.int64)
+        self.data = np.asarray(data, dtype=self.dtype)
+
+    @classmethod
+    def from_dense(cls, array, base=None):
+        """
+        Build sparse storage from a dense array
+
+        Parameters
+        ----------
+        array : np.ndarray
+        base : float, optional
+            base value, by default the most common value of the array
+
+        Returns
+        -------
+            SparseValues
+        """
+        flat = np.ravel(array)
+        if base is None:
+            unique, counts = np.unique(flat, return_counts=True)
+            base = unique[np.argmax(counts)]
+        index = np.flatnonzero(~_equal(flat, base))
+        return cls(base, flat.size, index, flat[index], dtype=flat.dtype)
+
+    @property
+    def nnz(self):
+        """
+        Returns
+        -------
+            int : number of exceptions
+        """
+        return self.index.size
+
+    @property
+    def nbytes(self):
+        """
+        Returns
+        -------
+            int : memory used by the exceptions in bytes
+        """
+        return self.index.nbytes + self.data.nbytes
+
+    @property
+    def flat(self):
+        """
+        Flat iterator-like accessor that expands slices on demand, so the
+        storage can be written in chunks without being expanded in full
+        """
+        return _FlatAccessor(self)
+
+    def toarray(self, out=None):
+        """
+        Expand to a dense flat array
+
+        Parameters
+        ----------
+        out : np.ndarray, optional
+            flat array that is filled in place
+
+        Returns
+        -------
+            np.ndarray
+        """
+        if out is None:
+            out = np.empty(self.size, dtype=self.dtype)
+        out[:] = self.base
+        out[self.index] = self.data
+        return out
+
+    def copy(self):
+        return SparseValues(
+            self.base, self.size, self.index.copy(), self.data.copy(),
+            dtype=self.dtype,
+        )
+
+    def get(self, index):
+        """
+        Values of flat indices
+
+        Parameters
+        ----------
+        index : np.ndarray
+            flat indices
+
+        Returns
+        -------
+            np.ndarray
+        """
+        index = np.asarray(index)
+        out = np.full(index.shape, self.base, dtype=self.dtype)
+        pos = np.searchsorted(self.index, index)
+        pos = np.minimum(pos, max(self.nnz - 1, 0))
+        if self.nnz:
+            found = self.index[pos] == index
+            out[found] = self.data[pos[found]]
+        return out
+
+    def set(self, index, values):
+        """
+        Set the values of flat indices. Values equal to the base value
+        remove the exception, and the last value of a repeated index wins.
+
+        Parameters
+        ----------
+        index : np.ndarray
+            flat indices
+        values : np.ndarray
+            values broadcastable to index
+        """
+        index = np.asarray(index, dtype=np.int64)
+        values = np.broadcast_to(
+            np.asarray(values, dtype=self.dtype), index.shape
+        ).ravel()
+        index = index.ravel()
+        # keep the last occurrence of repeated indices
+        index, last = np.unique(index[::-1], return_index=True)
+        values = values[::-1][last]
+
+        keep = ~np.isin(self.index, index, assume_unique=True)
+        new = ~_equal(values, self.base)
+        index = np.concatenate([self.index[keep], index[new]])
+        data = np.concatenate([self.data[keep], values[new]])
+        order = np.argsort(index, kind="stable")
+        self.index = index[order]
+        self.data = data[order]
+
+    def apply(self, ufunc, *others, casting="same_kind"):
+        """
+        Apply an elementwise ufunc with scalar operands to every value. The
+        data type is kept, like for an in place operation on a dense array.
+        """
+        base = np.array(self.base)
+        ufunc(base, *others, out=base, casting=casting)
+        self.base = base[()]
+        ufunc(self.data, *others, out=self.data, casting=casting)
+        # exceptions may have become equal to the new base value
+        keep = ~_equal(self.data, self.base)
+        self.index = self.index[keep]
+        self.data = self.data[keep]
+
+    def value_counts(self):
+        """
+        Values and the number of cells that hold them
+
+        Returns
+        -------
+            tuple of np.ndarray : values, counts
+        """
+        values = np.concatenate([[self.base], self.data])
+        counts = np.ones(values.size, dtype=np.int64)
+        counts[0] = self.size - self.nnz
+        return values, counts
+
+    def take(self, shape, key):
+        """
+        Select values with a basic index (integers, slices, and ellipsis)
+        without expanding the whole array
+
+        Parameters
+        ----------
+        shape : tuple
+            array shape
+        key
+            basic index
+
+        Returns
+        -------
+            np.ndarray or None if the index is not a basic index
+        """
+        key = _expand_key(key, shape)
+        if key is None:
+            return None
+        if not any(isinstance(item, slice) for item in key):
+            return self.get(np.ravel_multi_index(key, shape))[()]
+        out = np.broadcast_to(self.base, shape)[tuple(key)].copy()
+        if not self.nnz:
+            return out
+
+        coords = np.unravel_index(self.index, shape)
+        mask = np.ones(self.nnz, dtype=bool)
+        out_coords = []
+        for item, n, c in zip(key, shape, coords):
+            if isinstance(item, slice):
+                start, _, step = item.indices(n)
+                pos = (c - start) // step
+                mask &= ((c - start) % step == 0) & (pos >= 0) & \
+                    (pos < len(range(*item.indices(n))))
+                out_coords.append(pos)
+            else:
+                mask &= c == item
+        out[tuple(pos[mask] for pos in out_coords)] = self.data[mask]
+        return out
+
+    def flat_index(self, shape, key):
+        """
+        Flat indices selected by a basic index
+
+        Parameters
+        ----------
+        shape : tuple
+            array shape
+        key
+            basic index
+
+        Returns
+        -------
+            np.ndarray or None if the index is not a basic index. The
+            indices have the shape of the selection
+        """
+        key = _expand_key(key, shape)
+        if key is None:
+            return None
+        axes = []
+        for item, n in zip(key, shape):
+            if isinstance(item, slice):
+                axes.append(np.arange(*item.indices(n)))
+            else:
+                axes.append(np.array([item]))
+        index = np.ravel_multi_index(np.ix_(*axes), shape)
+        keep = tuple(
+            slice(None) if isinstance(item, slice) else 0 for item in key
+        )
+        return index[keep]
+
+
+class _FlatAccessor:
+    """
+    Slice accessor that expands a range of SparseValues
+    """
+    def __init__(self, sparse):
+        self._sparse = sparse
+
+    def __getitem__(self, item):
+        sparse = self._sparse
+        start, stop, step = item.indices(sparse.size)
+        if step != 1:
+            raise IndexError("only contiguous slices are supported")
+        out = np.full(max(stop - start, 0), sparse.base, dtype=sparse.dtype)
+        lo, hi = np.searchsorted(sparse.index, [start, stop])
+        out[sparse.index[lo:hi] - start] = sparse.data[lo:hi]
+        return out
+
+
+def _equal(a, b):
+    """
+    Elementwise equality that treats nan values as equal
+    """
+    a = np.asarray(a)
+    if not np.issubdtype(a.dtype, np.inexact):
+        return a == b
+    return (a == b) | (np.isnan(a) & np.isnan(b))
+
+
+def _expand_key(key, shape):
+    """
+    Expand a basic index to one integer or slice per dimension. Negative
+    integers are converted to positive indices.
+
+    Returns
+    -------
+        list or None if the index is not a basic index
+    """
+    if not isinstance(key, tuple):
+        key = (key,)
+    for item in key:
+        if not (item is Ellipsis or isinstance(item, (int, np.integer,
+                                                      slice))):
+            return None
+    ndim = len(shape)
+    nellipsis = sum(item is Ellipsis for item in key)
+    if nellipsis > 1 or len(key) - nellipsis > ndim:
+        return None
+    fill = [slice(None)] * (ndim - len(key) + nellipsis)
+    if nellipsis:
+        ix = [item is Ellipsis for item in key].index(True)
+        key = list(key[:ix]) + fill + list(key[ix + 1:])
+    else:
+        key = list(key) + fill
+
+    for axis, (item, n) in enumerate(zip(key, shape)):
+        if isinstance(item, slice):
+            continue
+        if not -n <= item < n:
+            raise IndexError(
+                f"index {item} is out of bounds for axis {axis} with "
+                f"size {n}"
+            )
+        key[axis] = int(item) % n
+    return key
@@ -0,0 +1,84 @@
+import numpy as np
+from . import profiling
+
+
+# number of values formatted per write call
+CHUNKSIZE = 2 ** 16
+
+
+def write_array_block(
+    f, array, values_per_line=10, fmt="%.8e", chunksize=CHUNKSIZE
+):
+    """
+    Write array values to an open text file handle as a free format block
+
+    Values are formatted and written in chunks of about `chunksize` values,
+    so memory use does not depend on the size of the array. Arrays that
+    are not contiguous, like memory mapped binary layers, are only copied
+    one chunk at a time.
+
+    Parameters
+    ----------
+    f : file object
+        open text file handle
+    array : np.ndarray
+        array to write, values are written in C order
+    values_per_line : int
+        number of values written on each line
+    fmt : str
+        printf style format of a single value
+    chunksize : int
+        approximate number of values formatted at once
+
+    Returns
+    -------
+        int : number of values written
+    """
+    flat = array.flat
+    size = array.size
+    nrow = max(chunksize // values_per_line, 1)
+    chunksize = nrow * values_per_line
+    line = " ".join([fmt] * values_per_line) + "\n"
+    block = line * nrow
+    written = 0
+    for start in range(0, size, chunksize):
+        chunk = flat[start:start + chunksize].tolist()
+        if len(chunk) == chunksize:
+            written += f.write(block % tuple(chunk))
+            continue
+
+        nfull, rem = divmod(len(chunk), values_per_line)
+        nfull_values = nfull * values_per_line
+        written += f.write((line * nfull) % tuple(chunk[:nfull_values]))
+        if rem:
+            written += f.write(
+                " ".join([fmt] * rem) % tuple(chunk[nfull_values:])
+            )
+            written += f.write("\n")
+    profiling.count(bytes_written=written, values=size)
+    return size
+
+
+def all_equal(array, chunksize=CHUNKSIZE * 16):
+    """
+    Check if all values of an array are equal without making a full copy
+
+    Parameters
+    ----------
+    array : np.ndarray
+    chunksize : int
+        number of values compared at once
+
+    Returns
+    -------
+        bool
+    """
+    if array.size == 0:
+        return True
+    flat = array.flat
+    first = flat[0]
+    for start in range(0, array.size, chunksize):
+        chunk = flat[start:start + chunksize]
+        if not np.all(chunk == first):
+            return False
+    return True
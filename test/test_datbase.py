@@ -0,0 +1,25 @@
+import subprocess
+import sys
+import pytest
+
+pytest.importorskip("flopy")
+
+CHECK = """
+import numpy as np
+from flopy4.data import MFArray, MFList
+from flopy4.data.constants import How
+assert isinstance(MFArray(1.0, (2, 2), How.constant), datbase.DataInterface)
+assert isinstance(MFList(), datbase.DataListInterface)
+"""
+
+
+@pytest.mark.parametrize(
+    "imports",
+    [
+        "import flopy.datbase as datbase\nimport flopy4.data\n",
+        "import flopy4.data\nimport flopy.datbase as datbase\n",
+    ],
+)
+def test_flopy_recognizes_data_objects(imports):
+    # a fresh interpreter, the order of the imports matters
+    subprocess.run([sys.executable, "-c", imports + CHECK], check=True)
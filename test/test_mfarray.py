@@ -0,0 +1,161 @@
+import numpy as np
+from pathlib import Path
+import pytest
+from flopy4.data import MFArray
+from flopy4.data.constants import How
+from flopy4.data import mixins
+from flopy4.data.mixins import _chunked_median
+from flopy4.data.sparse import SparseValues
+
+
+def _chunks(values, size=7):
+    return lambda: (
+        values[i:i + size] for i in range(0, len(values), size)
+    )
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [0.0] * 100 + [1.0] * 100,
+        [0.0] * 100 + [1.0] * 101,
+        [1.0, np.nextafter(1.0, 2.0)] * 100,
+        [1.0, np.nextafter(1.0, 2.0)] * 100 + [1.0],
+        [3.0, 3.0, 5.0, 5.0, 9.0] * 40,
+    ],
+)
+@pytest.mark.parametrize("nbins", [4, 4096])
+def test_chunked_median_few_distinct_values(values, nbins):
+    values = np.array(values)
+    median = _chunked_median(_chunks(values), limit=50, nbins=nbins)
+    assert median == np.median(values)
+
+
+def test_chunked_median_random():
+    values = np.random.default_rng(0).random(1001)
+    median = _chunked_median(_chunks(values), limit=50, nbins=16)
+    assert median == np.median(values)
+
+
+def test_median_two_values_larger_than_chunksize():
+    values = np.zeros(4_400_000)
+    values[2_200_000:] = 1.0
+    mfa = MFArray(values, (2, 2200, 1000), How.internal)
+    assert mfa.median() == 0.5
+
+
+def _layered(layers, shape):
+    return MFArray(
+        np.array(layers, dtype=object), shape, how=None, layered=True
+    )
+
+
+def test_chunked_median_weighted():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 6, 301).astype(float)
+    weighted = np.array([1.0, 4.0, 2.5]), np.array([50, 120, 7])
+    expected = np.median(np.concatenate([values, np.repeat(*weighted)]))
+    for limit in (10, 10 ** 6):
+        median = _chunked_median(
+            _chunks(values), limit=limit, nbins=4, weighted=weighted
+        )
+        assert median == expected
+
+
+def test_median_constant_layers_not_streamed(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("constant layers were streamed")
+
+    monkeypatch.setattr(mixins, "_chunked_median", fail)
+    shape = (2000, 1000)
+    mfa = _layered(
+        [MFArray(value, shape, How.constant) for value in (3.0, 1.0, 2.0)],
+        (3,) + shape,
+    )
+    assert mfa.median() == 2.0
+
+
+def test_median_mixed_layers_streams_dense_layers(monkeypatch):
+    monkeypatch.setattr(mixins, "CHUNKSIZE", 100)
+    rng = np.random.default_rng(0)
+    dense = [rng.random(600), rng.random(600) * 2]
+    mfa = _layered(
+        [
+            MFArray(dense[0].copy(), (20, 30), How.internal),
+            MFArray(5.0, (20, 30), How.constant),
+            MFArray(dense[1].copy(), (20, 30), How.internal),
+        ],
+        (3, 20, 30),
+    )
+    expected = np.median(np.concatenate(dense + [np.full(600, 5.0)]))
+    assert mfa.median() == expected
+
+
+def test_setitem_large_selection_of_constant(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("sparse index built for a large selection")
+
+    monkeypatch.setattr(SparseValues, "flat_index", fail)
+    values = np.random.default_rng(0).random((200, 100))
+    mfa = MFArray(1.0, (200, 100), How.constant)
+    mfa[:] = values
+    assert mfa.how == How.internal
+    np.testing.assert_array_equal(mfa.values, values)
+
+
+def test_setitem_small_selection_of_constant():
+    mfa = MFArray(1.0, (200, 100), How.constant)
+    mfa[5, :3] = [0.0, 2.0, 3.0]
+    assert mfa.how == How.sparse
+    np.testing.assert_array_equal(mfa.values[5, :4], [0.0, 2.0, 3.0, 1.0])
+
+
+DATA = Path(__file__).parent.parent / "data" / "mfarray"
+
+FIXTURES = [
+    ("constant.txt", (1000, 100), False),
+    ("internal.txt", (1000, 100), False),
+    ("internal_factor.txt", (1000, 100), False),
+    ("external.txt", (1000, 100), False),
+    ("external_factor.txt", (1000, 100), False),
+    ("external_binary.txt", (1000, 100), False),
+    ("external_binary_factor.txt", (1000, 100), False),
+    ("constant_layered.txt", (3, 1000, 100), True),
+    ("internal_layered.txt", (3, 1000, 100), True),
+    ("mixed_layered.txt", (3, 1000, 100), True),
+]
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+@pytest.mark.parametrize("fname,shape,layered", FIXTURES)
+def test_write_load_round_trip(tmp_path, fname, shape, layered, lazy):
+    with open(DATA / fname) as f:
+        mfa = MFArray.load(f, DATA, shape, layered=layered, lazy=lazy)
+
+    # OPEN/CLOSE paths of the fixtures point to a sibling directory
+    cwd = tmp_path / "mfarray"
+    cwd.mkdir()
+    (tmp_path / "external").mkdir()
+    with open(cwd / fname, "w") as f:
+        mfa.write(f, cwd)
+    with open(cwd / fname) as f:
+        reloaded = MFArray.load(f, cwd, shape, layered=layered, lazy=lazy)
+
+    assert reloaded.how == mfa.how
+    np.testing.assert_allclose(reloaded.values, mfa.values, rtol=1e-8)
+
+
+@pytest.mark.parametrize(
+    "how,values",
+    [(How.internal, np.arange(12, dtype=np.int32)), (How.constant, 3)],
+)
+def test_ufunc_casting_matches_numpy(how, values):
+    expected = np.broadcast_to(values, (12,)).reshape(3, 4) + 2
+    mfa = MFArray(values, (3, 4), how, dtype=np.int32)
+    with pytest.raises(TypeError):
+        np.multiply(mfa, 1.5)
+    with pytest.raises(TypeError):
+        mfa *= 1.5
+    np.add(mfa, 2)
+    assert mfa.dtype == np.int32
+    assert np.array_equal(mfa.values, expected)
@@ -0,0 +1,50 @@
+import io
+import numpy as np
+from flopy4.data import MFList
+
+
+def _load(text):
+    f = io.StringIO(f"BEGIN PERIOD 1\n{text}END PERIOD\n")
+    return MFList.load(f, ".", [("head", np.float64)], boundnames=True)
+
+
+def test_load_boundnames():
+    mfl = _load("1 1 1 5.0 well_a\n2 3 4 6.0 well_b\n")
+    data = mfl[0]
+    assert data["layer"].tolist() == [0, 1]
+    assert data["head"].tolist() == [5.0, 6.0]
+    assert data["boundname"].tolist() == ["well_a", "well_b"]
+
+
+def test_load_records_without_boundname():
+    # 20 tokens would also split evenly into 4 records of 5 columns
+    mfl = _load("1 1 1 5.0\n" * 5)
+    data = mfl[0]
+    assert len(data) == 5
+    assert data["layer"].tolist() == [0] * 5
+    assert data["head"].tolist() == [5.0] * 5
+    assert data["boundname"].tolist() == [""] * 5
+
+
+def test_load_some_records_without_boundname():
+    mfl = _load("1 1 1 5.0 well_a\n1 1 2 6.0\n")
+    data = mfl[0]
+    assert data["col"].tolist() == [0, 1]
+    assert data["boundname"].tolist() == ["well_a", ""]
+
+
+def test_load_string_fields():
+    f = io.StringIO(
+        "BEGIN PERIOD 1\n1 1 1 wel_ts\n1 1 2 other_ts\nEND PERIOD\n"
+    )
+    mfl = MFList.load(f, ".", [("q", "U40")])
+    data = mfl[0]
+    assert data["col"].tolist() == [0, 1]
+    assert data["q"].tolist() == ["wel_ts", "other_ts"]
+
+
+def test_load_fortran_exponents_some_records_without_boundname():
+    mfl = _load("1 1 1 1.0D+00 well_d\n1 1 2 2.5d0\n")
+    data = mfl[0]
+    assert data["head"].tolist() == [1.0, 2.5]
+    assert data["boundname"].tolist() == ["well_d", ""]
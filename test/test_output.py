@@ -0,0 +1,150 @@
+import numpy as np
+import pytest
+from flopy4.data import BudgetFile, HeadFile
+from flopy4.data.binary import _header_dtype
+
+flopy = pytest.importorskip("flopy")
+
+NLAY, NROW, NCOL = 3, 4, 5
+# (kstp, kper, totim) of every time step
+STEPS = [(1, 1, 1.5), (2, 1, 3.0), (1, 2, 4.5), (2, 2, 6.0)]
+
+
+def _float(precision):
+    return "<f8" if precision == "double" else "<f4"
+
+
+def _write_heads(fname, precision):
+    rng = np.random.default_rng(0)
+    header_dtype = _header_dtype(bintype="vardis", precision=precision)
+    with open(fname, "wb") as f:
+        for kstp, kper, totim in STEPS:
+            for k in range(NLAY):
+                header = np.zeros(1, dtype=header_dtype)
+                header["kstp"], header["kper"] = kstp, kper
+                header["pertim"], header["totim"] = totim, totim
+                header["text"] = "HEAD".rjust(16)
+                header["m1"], header["m2"], header["m3"] = NCOL, NROW, k + 1
+                header.tofile(f)
+                rng.random((NROW, NCOL)).astype(_float(precision)).tofile(f)
+
+
+def _write_budget(fname, precision):
+    rng = np.random.default_rng(0)
+    ft = _float(precision)
+    header1 = np.dtype([
+        ("kstp", "<i4"), ("kper", "<i4"), ("text", "S16"),
+        ("ndim1", "<i4"), ("ndim2", "<i4"), ("ndim3", "<i4"),
+    ])
+    header2 = np.dtype([
+        ("imeth", "<i4"), ("delt", ft), ("pertim", ft), ("totim", ft),
+    ])
+    names = [b"MODEL".rjust(16)] * 3 + [b"CHD-1".rjust(16)]
+    nja = 7
+    with open(fname, "wb") as f:
+        for kstp, kper, totim in STEPS:
+            np.array(
+                [(kstp, kper, b"FLOW-JA-FACE".rjust(16), nja, 1, -1)],
+                dtype=header1,
+            ).tofile(f)
+            np.array([(1, 1.0, totim, totim)], dtype=header2).tofile(f)
+            rng.random(nja).astype(ft).tofile(f)
+
+            np.array(
+                [(kstp, kper, b"CHD".rjust(16), NCOL, NROW, -NLAY)],
+                dtype=header1,
+            ).tofile(f)
+            np.array([(6, 1.0, totim, totim)], dtype=header2).tofile(f)
+            np.array(names, dtype="S16").tofile(f)
+            np.array([2], dtype="<i4").tofile(f)
+            np.array([b"CONC".ljust(16)], dtype="S16").tofile(f)
+            np.array([3], dtype="<i4").tofile(f)
+            records = np.zeros(3, dtype=[
+                ("node", "<i4"), ("node2", "<i4"), ("q", ft), ("CONC", ft),
+            ])
+            records["node"] = [5, 9, 5]
+            records["node2"] = [1, 2, 3]
+            records["q"] = rng.random(3)
+            records["CONC"] = rng.random(3)
+            records.tofile(f)
+
+
+@pytest.fixture(params=["single", "double"])
+def precision(request):
+    return request.param
+
+
+def test_head_file_selection(tmp_path, precision):
+    fname = tmp_path / "model.hds"
+    _write_heads(fname, precision)
+    hds = HeadFile(fname)
+    ref = flopy.utils.HeadFile(fname, precision=precision)
+
+    np.testing.assert_allclose(hds.times, ref.get_times())
+    assert hds.kstpkper == [(kstp, kper) for kstp, kper, _ in STEPS]
+    assert hds.shape == (NLAY, NROW, NCOL)
+    for kstp, kper, totim in STEPS:
+        expected = ref.get_data(kstpkper=(kstp - 1, kper - 1))
+        np.testing.assert_array_equal(
+            hds.get_data(kstpkper=(kstp, kper)), expected
+        )
+        np.testing.assert_array_equal(hds.get_data(totim=totim), expected)
+        np.testing.assert_array_equal(
+            hds.get_data(totim=totim, layer=1), expected[1]
+        )
+    np.testing.assert_array_equal(hds.get_data(), ref.get_data(idx=-1))
+
+
+def test_head_file_iteration_and_time_series(tmp_path, precision):
+    fname = tmp_path / "model.hds"
+    _write_heads(fname, precision)
+    hds = HeadFile(fname)
+    ref = flopy.utils.HeadFile(fname, precision=precision)
+
+    assert len(list(hds.iter_records())) == NLAY * len(STEPS)
+    for (totim, data), expected in zip(hds.iter_data(), ref.get_alldata()):
+        np.testing.assert_array_equal(data, expected)
+    cells = [(0, 1, 2), (2, 3, 4), (1, 0, 0)]
+    np.testing.assert_allclose(hds.get_ts(cells), ref.get_ts(cells))
+
+
+def test_budget_file_selection(tmp_path, precision):
+    fname = tmp_path / "model.cbc"
+    _write_budget(fname, precision)
+    cbc = BudgetFile(fname)
+    ref = flopy.utils.CellBudgetFile(fname, precision=precision)
+
+    assert cbc.precision == precision
+    assert cbc.texts == ["FLOW-JA-FACE", "CHD"]
+    np.testing.assert_allclose(cbc.times, ref.get_times())
+    assert cbc.kstpkper == [(kstp, kper) for kstp, kper, _ in STEPS]
+    for kstp, kper, totim in STEPS:
+        by_step = cbc.get_data(text="FLOW-JA-FACE", kstpkper=(kstp, kper))
+        by_time = cbc.get_data(text="FLOW-JA-FACE", totim=totim)
+        expected = ref.get_data(
+            text="FLOW-JA-FACE", kstpkper=(kstp - 1, kper - 1)
+        )
+        assert len(by_step) == len(by_time) == len(expected) == 1
+        np.testing.assert_array_equal(by_step[0].ravel(), expected[0].ravel())
+        np.testing.assert_array_equal(by_time[0].ravel(), expected[0].ravel())
+
+        chd = cbc.get_data(text="CHD", totim=totim, paknam="CHD-1")
+        expected = ref.get_data(text="CHD", totim=totim)
+        assert len(chd) == 1
+        for name in ("node", "node2", "q", "CONC"):
+            np.testing.assert_array_equal(chd[0][name], expected[0][name])
+
+
+def test_budget_file_time_series(tmp_path, precision):
+    fname = tmp_path / "model.cbc"
+    _write_budget(fname, precision)
+    cbc = BudgetFile(fname)
+
+    ts = cbc.get_ts([4, 8, 0], "CHD")
+    for row, records in zip(ts, cbc.get_data(text="CHD")):
+        q = records["q"]
+        np.testing.assert_allclose(row[1:], [q[0] + q[2], q[1], 0.0])
+    ts = cbc.get_ts([0, 6], "FLOW-JA-FACE")
+    flows = [data.ravel()[[0, 6]] for data in cbc.get_data("FLOW-JA-FACE")]
+    np.testing.assert_allclose(ts[:, 1:], flows)
+    assert len(list(cbc.iter_records(text="chd"))) == len(STEPS)
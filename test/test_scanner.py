@@ -0,0 +1,127 @@
+import numpy as np
+from flopy4.data import FileIndex
+from flopy4.data.binary import BinaryArray
+from flopy4.data.constants import How
+
+NLAY, NROW, NCOL = 3, 2, 4
+
+PACKAGE = """\
+BEGIN OPTIONS
+  SAVE_FLOWS
+END OPTIONS
+
+BEGIN GRIDDATA
+  icelltype
+    CONSTANT 1
+  k LAYERED
+    INTERNAL FACTOR 2.0
+      1.0 2.0 3.0 4.0
+      5.0 6.0 7.0 8.0
+    CONSTANT 9.0
+    OPEN/CLOSE k3.bin (BINARY) FACTOR 0.5
+  k33
+    INTERNAL
+      1 2 3 4 5 6 7 8 9 10 11 12
+      13 14 15 16 17 18 19 20 21 22 23 24
+END GRIDDATA
+
+BEGIN PERIOD 1
+  1 1 1 10.0
+END PERIOD
+
+BEGIN PERIOD 3
+  1 2 1 11.0
+  2 1 4 12.0
+END PERIOD
+"""
+
+
+def _line(text):
+    """
+    Offset of the start of the line that contains text
+    """
+    return PACKAGE.rindex("\n", 0, PACKAGE.index(text)) + 1
+
+
+def _scan(tmp_path):
+    fpath = tmp_path / "model.npf"
+    fpath.write_bytes(PACKAGE.encode())
+    values = np.arange(NROW * NCOL, dtype=np.float64).reshape(NROW, NCOL)
+    BinaryArray().write_binary_array(tmp_path / "k3.bin", values)
+    return FileIndex.scan(fpath), values
+
+
+def test_block_offsets(tmp_path):
+    index, _ = _scan(tmp_path)
+    assert [block.name for block in index.blocks] == [
+        "options", "griddata", "period", "period"
+    ]
+    for block in index.blocks:
+        assert PACKAGE[block.start:].startswith("BEGIN")
+        assert PACKAGE[block.end:].lstrip().startswith("END")
+        line_end = PACKAGE.index("\n", block.start) + 1
+        assert block.data_start == line_end
+
+    griddata = index.block("griddata")
+    assert griddata.start == PACKAGE.index("BEGIN GRIDDATA")
+    assert griddata.end == PACKAGE.index("END GRIDDATA")
+    assert sorted(index.periods) == [0, 2]
+    assert index.periods[2].start == PACKAGE.index("BEGIN PERIOD 3")
+
+
+def test_array_offsets(tmp_path):
+    index, _ = _scan(tmp_path)
+    assert [array.name for array in index.arrays] == [
+        "icelltype", "k", "k33"
+    ]
+
+    icelltype = index.array("icelltype")
+    assert not icelltype.layered
+    assert icelltype.offset == _line("CONSTANT 1")
+    assert icelltype.records[0].how == "CONSTANT"
+
+    k = index.array("k")
+    assert k.layered
+    assert [record.how for record in k.records] == [
+        "INTERNAL", "CONSTANT", "OPEN/CLOSE"
+    ]
+    assert [record.offset for record in k.records] == [
+        _line("INTERNAL FACTOR 2.0"),
+        _line("CONSTANT 9.0"),
+        _line("OPEN/CLOSE k3.bin"),
+    ]
+    assert k.records[0].factor == "2.0"
+    external = k.records[2]
+    assert external.fname == "k3.bin"
+    assert external.binary
+    assert external.factor == "0.5"
+
+    k33 = index.array("k33")
+    assert k33.offset == _line("INTERNAL\n      1 2 3")
+
+
+def test_load_array_at_offset(tmp_path):
+    index, values = _scan(tmp_path)
+    k = index.load_array("k", (NLAY, NROW, NCOL))
+    expected = np.stack([
+        2.0 * np.arange(1.0, 9.0).reshape(NROW, NCOL),
+        np.full((NROW, NCOL), 9.0),
+        0.5 * values,
+    ])
+    np.testing.assert_array_equal(k.values, expected)
+    assert k._flat[1].how == How.constant
+
+    k33 = index.load_array("k33", (NLAY, NROW, NCOL))
+    np.testing.assert_array_equal(
+        k33.values.ravel(), np.arange(1.0, 25.0)
+    )
+    assert index.load_array("icelltype", (NLAY, NROW, NCOL)).how == \
+        How.constant
+
+
+def test_load_periods_at_offset(tmp_path):
+    index, _ = _scan(tmp_path)
+    mfl = index.load_periods([("head", np.float64)], kpers=[2])
+    data = mfl[2]
+    assert data["head"].tolist() == [11.0, 12.0]
+    assert data["col"].tolist() == [0, 3]
@@ -0,0 +1,91 @@
+import multiprocessing
+import numpy as np
+import pytest
+from flopy4.data import MFArray
+from flopy4.data.constants import How
+
+
+def _layered():
+    layers = [
+        MFArray(np.full(6, float(ix)), (2, 3), How.internal)
+        for ix in range(3)
+    ]
+    layers.append(MFArray(4.0, (2, 3), How.constant))
+    return MFArray(
+        np.array(layers, dtype=object), (4, 2, 3), how=None, layered=True
+    )
+
+
+def _add_one(handle):
+    mfa = handle.attach()
+    mfa += 1.0
+    handle.close()
+
+
+@pytest.fixture
+def handles():
+    handles = []
+    yield handles
+    for handle in handles:
+        handle.close()
+        handle.unlink()
+
+
+def test_to_shared_attach(handles):
+    mfa = MFArray(np.arange(12.0), (3, 4), How.internal)
+    handle = mfa.to_shared()
+    handles.append(handle)
+    attached = handle.attach()
+    np.testing.assert_array_equal(attached.values, mfa.values)
+
+    attached[0, 0] = 100.0
+    assert mfa.values[0, 0] == 100.0
+
+
+def test_to_shared_attach_layered(handles):
+    mfa = _layered()
+    expected = mfa.values.copy()
+    handle = mfa.to_shared()
+    handles.append(handle)
+    attached = handle.attach()
+    assert attached._is_buffered()
+    np.testing.assert_array_equal(attached.values, expected)
+
+    attached[1] = 7.0
+    assert np.all(mfa.values[1] == 7.0)
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="needs the fork start method",
+)
+def test_to_shared_worker_process(handles):
+    mfa = MFArray(np.arange(12.0), (3, 4), How.internal)
+    handle = mfa.to_shared()
+    handles.append(handle)
+    process = multiprocessing.get_context("fork").Process(
+        target=_add_one, args=(handle,)
+    )
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+    np.testing.assert_array_equal(mfa.values.ravel(), np.arange(1.0, 13.0))
+
+
+def test_close_keeps_arrays_valid(handles):
+    mfa = _layered()
+    expected = mfa.values.copy()
+    handle = mfa.to_shared()
+    handles.append(handle)
+    attached = handle.attach()
+    handle.close()
+
+    # both arrays now hold private copies of the values
+    np.testing.assert_array_equal(mfa.values, expected)
+    np.testing.assert_array_equal(attached.values, expected)
+    assert mfa.sum() == expected.sum()
+    mfa[2] = 1.0
+    assert np.all(attached.values[2] == 2.0)
+
+    # the block can still be attached to after closing
+    np.testing.assert_array_equal(handle.attach().values, expected)